@@ -1,17 +1,30 @@
+import hashlib
+import io
+import logging
 import os
-from flask import Flask, request, jsonify
+import time
+from flask import Blueprint, Flask, Response, request, jsonify, url_for
 from flask_cors import CORS
 from neo4j import GraphDatabase, basic_auth
 from dotenv import load_dotenv # Opcional, para .env
 
-from bd_funtions import registrar_estudiante_y_cursos_en_neo4j
+from bd_funtions import registrar_estudiante_y_cursos_en_neo4j_lote, registrar_observador_ingesta
+from cache_lru import CacheLRU, Generaciones
+from cola_ingesta import ColaIngesta, ColaLlena
+from curriculo import (MOTIVO_ESTUDIANTE_NO_ENCONTRADO, MOTIVO_SIN_CURSOS_APROBADOS,
+                       MOTIVO_SIN_ELECTIVAS_ELEGIBLES, MotorCurricular, motivo_sin_recomendaciones)
+from elegibilidad import leer_elegibilidad, materializar_estudiantes
+from esquema import asegurar_esquema
+from metricas import CONTENT_TYPE, leer_con_tiempos, registro
 from funtions import *
 
 # Cargar variables de entorno (opcional)
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+# Las rutas se registran en un blueprint; create_app() construye la aplicación
+api = Blueprint('api', __name__)
+# Mismo logger que app.logger (Flask usa el nombre del módulo); también sirve fuera de una solicitud
+logger = logging.getLogger(__name__)
 
 # --- Configuración de Neo4j ---
 # Usa variables de entorno o valores por defecto si no están definidas
@@ -19,67 +32,148 @@ NEO4J_URI = os.getenv('NEO4J_URI')
 NEO4J_USER = os.getenv('NEO4J_USER')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD') # Cambia 'password' por tu contraseña por defecto si no usas .env
 
-# Crear el driver de Neo4j una sola vez
-# Es importante manejar la conexión de forma eficiente en producción
-try:
-    driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
-    driver.verify_connectivity() # Comprueba la conexión al iniciar
-    print("Conexión a Neo4j establecida.")
-except Exception as e:
-    print(f"Error al conectar a Neo4j: {e}")
-    driver = None # Marcar como no conectado si falla
+# Pool de conexiones: un driver por proceso (worker de gunicorn), compartido por sus hilos
+NEO4J_MAX_POOL_SIZE = int(os.getenv('NEO4J_MAX_POOL_SIZE', 100))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_ACQUISITION_TIMEOUT', 60))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv('NEO4J_MAX_CONNECTION_LIFETIME', 3600))
+
+# Recursos por proceso; los crea iniciar_servicios()
+driver = None
+motor_curricular = None
+cache_recomendaciones = None
+cache_transcripciones = None
+cola_ingesta = None
+generaciones = None
+
+def crear_driver():
+    """Crea el driver de Neo4j con el pool configurado por variables de entorno."""
+    return GraphDatabase.driver(NEO4J_URI,
+                                auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD),
+                                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME)
+
+# Con NEO4J_ENSURE_SCHEMA=1 cada proceso crea al iniciar las restricciones e índices
+# que falten (ver esquema.py; también se puede aplicar con "python esquema.py").
+NEO4J_ENSURE_SCHEMA = os.getenv('NEO4J_ENSURE_SCHEMA', '0') == '1'
+
+# --- Motor curricular en memoria ---
+# 'local' (por defecto) evalúa las recomendaciones con el pensum cargado en memoria;
+# 'cypher' ejecuta RECOMMENDATION_QUERY completa en cada solicitud.
+RECOMMENDATION_ENGINE = os.getenv('RECOMMENDATION_ENGINE', 'local')
+CURRICULUM_REFRESH_SECONDS = float(os.getenv('CURRICULUM_REFRESH_SECONDS', 0))
+
+# --- Extracción de texto de PDFs ---
+# PDF_EXTRACTION_WORKERS > 0 reparte las páginas entre ese número de procesos;
+# 0 (por defecto) extrae en el hilo de la solicitud. PDF_MAX_PAGES limita las páginas leídas.
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', 0))
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 50))
+# PDF_FAST_EXTRACTION=1 lee el texto directamente de los caracteres y solo de las páginas
+# con notas (ver funtions._texto_rapido); validar con benchmarks/validar_extraccion.py.
+PDF_FAST_EXTRACTION = os.getenv('PDF_FAST_EXTRACTION', '0') == '1'
+
+# --- Elegibilidad materializada (ver elegibilidad.py) ---
+# Con ELIGIBILITY_MATERIALIZED=1 y el motor local, cada ingesta recalcula las relaciones
+# ELIGIBLE_FOR del estudiante y las recomendaciones con ELIGIBILITY_PASSING_GRADE se leen
+# de ellas. Si están desactualizadas (otro pensum, otra nota o notas nuevas sin
+# recalcular) se usa el cálculo normal. "python elegibilidad.py" las reconstruye todas.
+ELIGIBILITY_MATERIALIZED = os.getenv('ELIGIBILITY_MATERIALIZED', '0') == '1'
+ELIGIBILITY_PASSING_GRADE = float(os.getenv('ELIGIBILITY_PASSING_GRADE', 3.0))
+
+# --- Caché de recomendaciones ---
+# Clave (student_id, passingGrade); se invalida cuando se ingesta un PDF del estudiante
+# y se vacía al refrescar el pensum. RECOMMENDATION_CACHE_PATH activa un archivo SQLite
+# local compartido entre workers. RECOMMENDATION_CACHE_SIZE=0 desactiva la caché.
+RECOMMENDATION_CACHE_SIZE = int(os.getenv('RECOMMENDATION_CACHE_SIZE', 10000))
+RECOMMENDATION_CACHE_TTL = float(os.getenv('RECOMMENDATION_CACHE_TTL', 300))
+RECOMMENDATION_CACHE_PATH = os.getenv('RECOMMENDATION_CACHE_PATH')
+
+# --- Estado compartido entre workers ---
+# Archivo SQLite local con los contadores de generación (cache_lru.Generaciones) del
+# pensum y de las cachés: un refresco del pensum o una ingesta en un worker invalida
+# el pensum y las entradas en caché de todos los workers del host. Sin él cada worker
+# solo ve sus propias invalidaciones; gunicorn.conf.py lo define cuando hay varios workers.
+SHARED_STATE_PATH = os.getenv('SHARED_STATE_PATH') or RECOMMENDATION_CACHE_PATH
+
+# --- Métricas (expuestas en /metrics) ---
+ETAPAS_RECOMENDACION = registro.histograma(
+    "recommendation_stage_seconds",
+    "Tiempo por etapa de una recomendación (session_acquire, query, consume, evaluate, serialize).",
+    ("engine", "stage"))
+DURACION_RECOMENDACION = registro.histograma(
+    "recommendation_request_seconds",
+    "Tiempo total de /recommendations/student/<id>, según si la respuesta salió de la caché.",
+    ("engine", "cache"))
+ETAPAS_PDF = registro.histograma(
+    "pdf_ingest_stage_seconds",
+    "Tiempo por etapa del procesamiento de un PDF (extract, parse, neo4j_write).",
+    ("stage",))
+
+def _motor_activo():
+    return "local" if motor_curricular else "cypher"
 
 # --- Consulta Cypher ---
-# Adaptada para usar parámetros y con coalesce para el tipo de electiva
+# Adaptada para usar parámetros y con coalesce para el tipo de electiva.
+# Devuelve siempre una sola fila: si el estudiante existe, sus cursos y créditos aprobados
+# y la lista ordenada de electivas, de modo que una respuesta vacía no necesita otra consulta.
 RECOMMENDATION_QUERY = """
 // Parámetros: $targetStudentId, $passingGrade
-WITH $targetStudentId AS targetStudentId, $passingGrade AS passingGrade
+OPTIONAL MATCH (s:Student {studentId: $targetStudentId})
 
 // --- 1. Encontrar cursos aprobados por el estudiante y calcular créditos totales ---
-MATCH (s:Student {studentId: targetStudentId})-[took_rel:TOOK]->(approved_course:Course)
-WHERE took_rel.grade >= passingGrade
-WITH s,
-     collect(approved_course) AS approvedCoursesList,
-     sum(coalesce(approved_course.credits, 0)) AS totalApprovedCredits // Usar coalesce si credits puede ser NULL
-
-// --- 2. Encontrar electivas potenciales (profesionales, no cursadas) ---
-MATCH (potential_elective:Course)
-// Asegura que es electiva y NO Sociohumanística (o no tiene tipo definido explícitamente)
-WHERE potential_elective.is_elective = true
-  AND coalesce(potential_elective.elective_type, 'Professional') <> 'Sociohumanistic' // Asume 'Professional' si no hay tipo
-  AND NOT (s)-[:TOOK]->(potential_elective)
-  AND size(approvedCoursesList) > 0 // El estudiante debe haber aprobado al menos un curso
-
-// --- 3. Verificar TODOS los prerrequisitos de CURSO ---
-AND NOT EXISTS {
-    MATCH (potential_elective)-[:REQUIRES]->(req:Course)
-    WHERE NOT req IN approvedCoursesList
+CALL {
+    WITH s
+    OPTIONAL MATCH (s)-[took_rel:TOOK]->(approved_course:Course)
+    WHERE took_rel.grade >= $passingGrade
+    RETURN collect(approved_course) AS approvedCoursesList,
+           sum(coalesce(approved_course.credits, 0)) AS totalApprovedCredits // Usar coalesce si credits puede ser NULL
 }
 
-// --- 4. Verificar el requisito de CRÉDITOS MÍNIMOS (si existe) ---
-AND (potential_elective.minCreditsRequired IS NULL OR totalApprovedCredits >= potential_elective.minCreditsRequired)
+// --- 2. Electivas elegibles con su puntaje (una lista vacía si no hay ninguna) ---
+CALL {
+    WITH s, approvedCoursesList, totalApprovedCredits
+    MATCH (potential_elective:Course)
+    // Asegura que es electiva y NO Sociohumanística (o no tiene tipo definido explícitamente)
+    WHERE s IS NOT NULL
+      AND size(approvedCoursesList) > 0 // El estudiante debe haber aprobado al menos un curso
+      AND potential_elective.is_elective = true
+      AND coalesce(potential_elective.elective_type, 'Professional') <> 'Sociohumanistic' // Asume 'Professional' si no hay tipo
+      AND NOT (s)-[:TOOK]->(potential_elective)
+
+    // --- 3. Verificar TODOS los prerrequisitos de CURSO ---
+      AND NOT EXISTS {
+          MATCH (potential_elective)-[:REQUIRES]->(req:Course)
+          WHERE NOT req IN approvedCoursesList
+      }
 
-// --- 5. Calcular un puntaje basado en las notas de los prerrequisitos DIRECTOS ---
-OPTIONAL MATCH (potential_elective)-[:REQUIRES]->(prereq_for_score:Course)<-[took_prereq_rel:TOOK]-(s)
-// Agrupamos por electiva para calcular el promedio de notas de sus prerrequisitos
-WITH potential_elective,
-     avg(took_prereq_rel.grade) AS avgPrereqGradeScore
+    // --- 4. Verificar el requisito de CRÉDITOS MÍNIMOS (si existe) ---
+      AND (potential_elective.minCreditsRequired IS NULL OR totalApprovedCredits >= potential_elective.minCreditsRequired)
 
-// --- 6. Devolver las electivas elegibles, ordenadas por el puntaje ---
-RETURN potential_elective.courseId AS id_materia_recomendada,
-       potential_elective.name AS nombre_materia,
-       coalesce(avgPrereqGradeScore, 0.0) AS puntaje_recomendacion // Asigna puntaje 0 si no hay prerreqs o no se encontraron notas
-ORDER BY puntaje_recomendacion DESC
+    // --- 5. Calcular un puntaje basado en las notas de los prerrequisitos DIRECTOS ---
+    OPTIONAL MATCH (potential_elective)-[:REQUIRES]->(prereq_for_score:Course)<-[took_prereq_rel:TOOK]-(s)
+    // Agrupamos por electiva para calcular el promedio de notas de sus prerrequisitos
+    WITH potential_elective,
+         coalesce(avg(took_prereq_rel.grade), 0.0) AS score // Puntaje 0 si no hay prerreqs o no se encontraron notas
+    ORDER BY score DESC
+    RETURN collect({id: potential_elective.courseId, name: potential_elective.name, score: score}) AS recommendations
+}
+
+// --- 6. Una sola fila con el estado del estudiante y las electivas ordenadas por puntaje ---
+RETURN s IS NOT NULL AS studentExists,
+       size(approvedCoursesList) AS approvedCourses,
+       totalApprovedCredits,
+       recommendations
 """
-@app.route('/')
+@api.route('/')
 def hello_world():
     return 'Hola Mundo desde Flask!'
 
 # --- Ruta de la API ---
-@app.route('/recommendations/student/<string:student_id>', methods=['GET'])
+@api.route('/recommendations/student/<string:student_id>', methods=['GET'])
 def get_recommendations(student_id):
     """
     Endpoint para obtener recomendaciones de electivas profesionales para un estudiante.
+    Con ?profile=1 ejecuta RECOMMENDATION_QUERY con PROFILE (sin caché) y devuelve el plan.
     """
     if not driver:
         return jsonify({"error": "No se pudo conectar a la base de datos Neo4j"}), 500
@@ -91,74 +185,434 @@ def get_recommendations(student_id):
     except ValueError:
         return jsonify({"error": "El parámetro 'passingGrade' debe ser un número."}), 400
 
-    recommendations = []
-    try:
-        # Usar una sesión para ejecutar la consulta
-        with driver.session() as session:
-            result = session.run(RECOMMENDATION_QUERY,
-                                 targetStudentId=student_id,
-                                 passingGrade=passing_grade)
-
-            # Procesar los resultados
-            for record in result:
-                recommendations.append({
-                    "id": record["id_materia_recomendada"],
-                    "name": record["nombre_materia"],
-                    "score": record["puntaje_recomendacion"]
-                })
-
-        # Verificar si se encontraron recomendaciones
-        if not recommendations:
-             # Podríamos verificar primero si el estudiante existe para dar un mensaje más específico
-             student_exists = check_student_exists(student_id)
-             if not student_exists:
-                  return jsonify({"message": f"Estudiante con ID '{student_id}' no encontrado."}), 404
-             else:
-                  return jsonify({"message": f"No se encontraron electivas recomendadas para el estudiante '{student_id}' que cumplan los criterios.", "recommendations": []}), 200
-
-
-        return jsonify(recommendations)
+    if request.args.get('profile') == '1':
+        try:
+            return jsonify(_perfilar_recomendaciones(student_id, passing_grade)), 200
+        except Exception as e:
+            print(f"Error al perfilar la consulta para estudiante {student_id}: {e}")
+            return jsonify({"error": "Ocurrió un error al procesar la solicitud."}), 500
 
+    inicio = time.perf_counter()
+    engine = _motor_activo()
+    clave_cache = f"{student_id}|{passing_grade!r}"
+    version_cache = None
+    if cache_recomendaciones:
+        # Se lee antes de calcular: si una ingesta invalida al estudiante mientras tanto,
+        # el resultado (posiblemente anterior a la ingesta) no se guarda
+        version_cache = cache_recomendaciones.version(student_id)
+        en_cache = cache_recomendaciones.obtener(clave_cache, grupo=student_id)
+        if en_cache is not None:
+            cuerpo, status = en_cache
+            respuesta = jsonify(cuerpo), status
+            DURACION_RECOMENDACION.observar(time.perf_counter() - inicio, engine=engine, cache="hit")
+            return respuesta
+
+    try:
+        cuerpo, status = _calcular_recomendaciones(student_id, passing_grade)
     except Exception as e:
         # Manejo básico de errores (mejorar en producción)
         print(f"Error al ejecutar consulta para estudiante {student_id}: {e}")
         return jsonify({"error": "Ocurrió un error al procesar la solicitud."}), 500
 
-def check_student_exists(student_id):
-    """Función auxiliar para verificar si un estudiante existe."""
-    if not driver: return False
+    if cache_recomendaciones:
+        cache_recomendaciones.guardar(clave_cache, [cuerpo, status], grupo=student_id, version=version_cache)
+    with ETAPAS_RECOMENDACION.medir(engine=engine, stage="serialize"):
+        respuesta = jsonify(cuerpo), status
+    DURACION_RECOMENDACION.observar(time.perf_counter() - inicio, engine=engine, cache="miss")
+    return respuesta
+
+def _calcular_recomendaciones(student_id, passing_grade):
+    """Calcula la respuesta (cuerpo, status) de recomendaciones de un estudiante."""
+    if motor_curricular:
+        resultado = None
+        if ELIGIBILITY_MATERIALIZED and passing_grade == ELIGIBILITY_PASSING_GRADE:
+            # Una sola lectura indexada de las relaciones ELIGIBLE_FOR
+            resultado = leer_elegibilidad(
+                driver, student_id, passing_grade, motor_curricular.modelo,
+                lector=lambda consulta, procesar, **parametros: leer_con_tiempos(
+                    driver, consulta, procesar,
+                    lambda etapa, segundos: ETAPAS_RECOMENDACION.observar(segundos, engine="materialized", stage=etapa),
+                    **parametros))
+        if resultado is None:
+            # Evaluación local: una sola lectura de las notas del estudiante
+            resultado = motor_curricular.recomendar(student_id, passing_grade)
+        recommendations, motivo = resultado
+    else:
+        # Una sola transacción de lectura (en un clúster se enruta a las réplicas)
+        record = leer_con_tiempos(driver, RECOMMENDATION_QUERY, lambda result: result.single(),
+                                  lambda etapa, segundos: ETAPAS_RECOMENDACION.observar(segundos, engine="cypher", stage=etapa),
+                                  targetStudentId=student_id, passingGrade=passing_grade)
+        recommendations = record["recommendations"]
+        motivo = motivo_sin_recomendaciones(record["studentExists"], record["approvedCourses"], recommendations)
+
+    if motivo == MOTIVO_ESTUDIANTE_NO_ENCONTRADO:
+        return {"message": f"Estudiante con ID '{student_id}' no encontrado.", "reason": motivo}, 404
+    if motivo == MOTIVO_SIN_CURSOS_APROBADOS:
+        return {"message": f"El estudiante '{student_id}' no tiene cursos aprobados con nota mayor o igual a {passing_grade}.", "reason": motivo, "recommendations": []}, 200
+    if motivo == MOTIVO_SIN_ELECTIVAS_ELEGIBLES:
+        return {"message": f"No se encontraron electivas recomendadas para el estudiante '{student_id}' que cumplan los criterios.", "reason": motivo, "recommendations": []}, 200
+    return recommendations, 200
+
+def _operador_perfil(operador):
+    """Resume un operador del plan de PROFILE (y sus hijos) para la respuesta JSON."""
+    args = operador.get("args", {})
+    return {
+        "operator": operador.get("operatorType"),
+        "details": args.get("Details"),
+        "rows": operador.get("rows"),
+        "estimatedRows": args.get("EstimatedRows"),
+        "dbHits": operador.get("dbHits"),
+        "pageCacheHits": operador.get("pageCacheHits"),
+        "pageCacheMisses": operador.get("pageCacheMisses"),
+        "children": [_operador_perfil(hijo) for hijo in operador.get("children", [])]
+    }
+
+def _total_db_hits(operador):
+    return (operador.get("dbHits") or 0) + sum(_total_db_hits(hijo) for hijo in operador.get("children", []))
+
+def _perfilar_recomendaciones(student_id, passing_grade):
+    """Ejecuta RECOMMENDATION_QUERY con PROFILE y devuelve el resultado junto al plan y los tiempos."""
+    tiempos_cliente = {}
+    record, resumen = leer_con_tiempos(
+        driver, "PROFILE " + RECOMMENDATION_QUERY,
+        lambda result: (result.single(), result.consume()),
+        lambda etapa, segundos: tiempos_cliente.__setitem__(etapa, round(segundos * 1000, 3)),
+        targetStudentId=student_id, passingGrade=passing_grade)
+    plan = resumen.profile or {}
+    return {
+        "studentExists": record["studentExists"],
+        "approvedCourses": record["approvedCourses"],
+        "approvedCredits": record["totalApprovedCredits"],
+        "recommendations": record["recommendations"],
+        "reason": motivo_sin_recomendaciones(record["studentExists"], record["approvedCourses"], record["recommendations"]),
+        "profile": {
+            "totalDbHits": _total_db_hits(plan),
+            "planner": plan.get("args", {}).get("planner"),
+            "runtime": plan.get("args", {}).get("runtime"),
+            "serverTimeMs": {
+                "resultAvailableAfter": resumen.result_available_after,
+                "resultConsumedAfter": resumen.result_consumed_after
+            },
+            "clientTimeMs": tiempos_cliente,
+            "plan": _operador_perfil(plan) if plan else None
+        }
+    }
+
+@api.route('/recommendations/cache/stats', methods=['GET'])
+def get_recommendation_cache_stats():
+    """Contadores de la caché de recomendaciones (del worker que atiende la solicitud)."""
+    if not cache_recomendaciones:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **cache_recomendaciones.estadisticas()}), 200
+
+# Máximo de estudiantes por solicitud de lote
+MAX_BATCH_STUDENTS = int(os.getenv('MAX_BATCH_STUDENTS', 5000))
+
+@api.route('/recommendations/batch', methods=['POST'])
+def get_batch_recommendations():
+    """
+    Recomendaciones para una cohorte completa en una sola solicitud.
+    Cuerpo JSON: {"studentIds": [...], "passingGrade": 3.0}
+    """
+    if not driver:
+        return jsonify({"error": "No se pudo conectar a la base de datos Neo4j"}), 500
+    if not motor_curricular:
+        return jsonify({"error": "Las recomendaciones por lote requieren el motor curricular en memoria."}), 409
+
+    datos = request.get_json(silent=True) or {}
+    student_ids = datos.get('studentIds')
+    if not isinstance(student_ids, list) or not all(isinstance(sid, str) for sid in student_ids):
+        return jsonify({"error": "El parámetro 'studentIds' debe ser una lista de códigos de estudiante."}), 400
+    if len(student_ids) > MAX_BATCH_STUDENTS:
+        return jsonify({"error": f"Se permiten como máximo {MAX_BATCH_STUDENTS} estudiantes por solicitud."}), 400
+    try:
+        passing_grade = float(datos.get('passingGrade', 3.0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "El parámetro 'passingGrade' debe ser un número."}), 400
+
+    try:
+        filas = motor_curricular.filas_estudiantes(list(dict.fromkeys(student_ids)))
+        resultados = motor_curricular.modelo.recomendar_lote(filas, passing_grade)
+    except Exception as e:
+        print(f"Error al calcular recomendaciones por lote: {e}")
+        return jsonify({"error": "Ocurrió un error al procesar la solicitud."}), 500
+
+    respuesta = {}
+    for sid in student_ids:
+        recomendaciones, motivo = resultados[sid]
+        if motivo == MOTIVO_ESTUDIANTE_NO_ENCONTRADO:
+            respuesta[sid] = {"message": f"Estudiante con ID '{sid}' no encontrado.", "reason": motivo}
+        else:
+            # Mismo campo "reason" que /recommendations/student/<id> (None si hay recomendaciones)
+            respuesta[sid] = {"recommendations": recomendaciones, "reason": motivo}
+    return jsonify({"results": respuesta}), 200
+
+# Límites de los endpoints de simulación y comparación
+MAX_SIMULATION_SCENARIOS = int(os.getenv('MAX_SIMULATION_SCENARIOS', 200))
+MAX_COMPARE_STUDENTS = int(os.getenv('MAX_COMPARE_STUDENTS', 50))
+
+def _leer_escenarios(escenarios, passing_grade):
+    """Valida los escenarios del cuerpo JSON; devuelve [(nombre, filas)] o None si el formato es inválido."""
+    if not isinstance(escenarios, list) or not escenarios:
+        return None
+    resultado = []
+    for posicion, escenario in enumerate(escenarios):
+        if not isinstance(escenario, dict) or not isinstance(escenario.get('courses'), list):
+            return None
+        filas = []
+        for curso in escenario['courses']:
+            if isinstance(curso, str):
+                # Sin nota: se supone aprobado con la nota mínima
+                filas.append((curso, passing_grade))
+            elif isinstance(curso, dict) and isinstance(curso.get('courseId'), str):
+                grade = curso.get('grade', passing_grade)
+                if isinstance(grade, bool) or not isinstance(grade, (int, float)):
+                    return None
+                filas.append((curso['courseId'], float(grade)))
+            else:
+                return None
+        resultado.append((str(escenario.get('name', f"escenario {posicion + 1}")), filas))
+    return resultado
+
+@api.route('/recommendations/student/<string:student_id>/simulate', methods=['POST'])
+def simulate_recommendations(student_id):
+    """
+    Simulación "¿qué electivas se habilitan si el estudiante aprueba estos cursos?".
+    Las notas se leen una sola vez; cada escenario se evalúa en memoria sobre una copia del estado.
+    Cuerpo JSON: {"passingGrade": 3.0, "scenarios": [{"name": "...", "courses": ["1155101", {"courseId": "1155102", "grade": 4.0}]}]}
+    """
+    if not driver:
+        return jsonify({"error": "No se pudo conectar a la base de datos Neo4j"}), 500
+    if not motor_curricular:
+        return jsonify({"error": "La simulación requiere el motor curricular en memoria."}), 409
+
+    datos = request.get_json(silent=True) or {}
     try:
-        with driver.session() as session:
-            result = session.run("MATCH (s:Student {studentId: $sid}) RETURN count(s) > 0 AS exists", sid=student_id)
-            record = result.single()
-            return record["exists"] if record else False
+        passing_grade = float(datos.get('passingGrade', 3.0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "El parámetro 'passingGrade' debe ser un número."}), 400
+    escenarios = _leer_escenarios(datos.get('scenarios'), passing_grade)
+    if escenarios is None:
+        return jsonify({"error": "El parámetro 'scenarios' debe ser una lista de objetos con una lista 'courses' de códigos o de {courseId, grade}."}), 400
+    if len(escenarios) > MAX_SIMULATION_SCENARIOS:
+        return jsonify({"error": f"Se permiten como máximo {MAX_SIMULATION_SCENARIOS} escenarios por solicitud."}), 400
+
+    try:
+        cargado = motor_curricular.estado(student_id, passing_grade)
     except Exception as e:
-        print(f"Error verificando existencia de estudiante {student_id}: {e}")
-        return False # Asumir que no existe si hay error
-
-# --- Manejo del cierre del driver ---
-@app.teardown_appcontext
-def close_neo4j_driver(exception=None):
-    """Cierra el driver de Neo4j al terminar la aplicación."""
-    # En una app real, la gestión del driver podría ser más sofisticada.
-    # Este cierre aquí es más relevante si el driver se creara por request.
-    # Si el driver es global, se cierra al detener el script Flask.
-    pass # El driver global se cierra al final
-
-
-# Consideración final: Cerrar el driver explícitamente al salir del script principal
-# Esto es importante para liberar recursos correctamente.
-# El bloque try/finally asegura que se intente cerrar incluso si hay errores al iniciar Flask.
-try:
-    # El código para iniciar la app (app.run) estaría aquí en un escenario real sin el if __name__ == '__main__'
-    pass
-finally:
-    if driver:
-        print("Cerrando conexión a Neo4j.")
-        driver.close()
-    
+        print(f"Error al leer las notas del estudiante {student_id}: {e}")
+        return jsonify({"error": "Ocurrió un error al procesar la solicitud."}), 500
+    if cargado is None:
+        return jsonify({"message": f"Estudiante con ID '{student_id}' no encontrado.", "reason": MOTIVO_ESTUDIANTE_NO_ENCONTRADO}), 404
+
+    modelo, estado = cargado
+    actuales = modelo.recomendar(estado)
+    ids_actuales = {r["id"] for r in actuales}
+    resultados = []
+    for nombre, filas in escenarios:
+        hipotetico, desconocidos = modelo.simular(estado, filas)
+        recomendaciones = modelo.recomendar(hipotetico)
+        resultados.append({
+            "name": nombre,
+            "approvedCredits": hipotetico.creditos_aprobados,
+            "unlocked": [r for r in recomendaciones if r["id"] not in ids_actuales],
+            "recommendations": recomendaciones,
+            "unknownCourses": desconocidos
+        })
+    return jsonify({
+        "studentId": student_id,
+        "passingGrade": passing_grade,
+        "current": {
+            "approvedCredits": estado.creditos_aprobados,
+            "recommendations": actuales,
+            "reason": motivo_sin_recomendaciones(True, estado.filas_aprobadas, actuales)
+        },
+        "scenarios": resultados
+    }), 200
+
+@api.route('/recommendations/compare', methods=['POST'])
+def compare_recommendations():
+    """
+    Compara las recomendaciones de varios estudiantes (una sola lectura de notas).
+    Cuerpo JSON: {"studentIds": [...], "passingGrade": 3.0}
+    """
+    if not driver:
+        return jsonify({"error": "No se pudo conectar a la base de datos Neo4j"}), 500
+    if not motor_curricular:
+        return jsonify({"error": "La comparación requiere el motor curricular en memoria."}), 409
+
+    datos = request.get_json(silent=True) or {}
+    student_ids = datos.get('studentIds')
+    if not isinstance(student_ids, list) or not student_ids or not all(isinstance(sid, str) for sid in student_ids):
+        return jsonify({"error": "El parámetro 'studentIds' debe ser una lista de códigos de estudiante."}), 400
+    student_ids = list(dict.fromkeys(student_ids))
+    if len(student_ids) > MAX_COMPARE_STUDENTS:
+        return jsonify({"error": f"Se permiten como máximo {MAX_COMPARE_STUDENTS} estudiantes por comparación."}), 400
+    try:
+        passing_grade = float(datos.get('passingGrade', 3.0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "El parámetro 'passingGrade' debe ser un número."}), 400
+
+    try:
+        filas = motor_curricular.filas_estudiantes(student_ids)
+        modelo = motor_curricular.modelo
+    except Exception as e:
+        print(f"Error al leer las notas para la comparación: {e}")
+        return jsonify({"error": "Ocurrió un error al procesar la solicitud."}), 500
+
+    estudiantes = {}
+    no_encontrados = []
+    elegibles_por_estudiante = []
+    for sid in student_ids:
+        if filas[sid] is None:
+            no_encontrados.append(sid)
+            continue
+        estado = modelo.estado_estudiante(filas[sid], passing_grade)
+        recomendaciones = modelo.recomendar(estado)
+        elegibles_por_estudiante.append({r["id"] for r in recomendaciones})
+        estudiantes[sid] = {
+            "approvedCourses": estado.filas_aprobadas,
+            "approvedCredits": estado.creditos_aprobados,
+            "recommendations": recomendaciones,
+            "reason": motivo_sin_recomendaciones(True, estado.filas_aprobadas, recomendaciones)
+        }
+    comunes = set.intersection(*elegibles_por_estudiante) if elegibles_por_estudiante else set()
+    for sid, resumen in estudiantes.items():
+        resumen["exclusive"] = [r["id"] for r in resumen["recommendations"]
+                                if all(r["id"] not in otros for otro_sid, otros in zip(estudiantes, elegibles_por_estudiante) if otro_sid != sid)]
+    return jsonify({
+        "students": estudiantes,
+        # En el orden del pensum
+        "common": [modelo.ids[idx] for idx in modelo.electivas if modelo.ids[idx] in comunes],
+        "notFound": no_encontrados
+    }), 200
 
-@app.route('/procesar-pdf', methods=['POST'])
+@api.route('/curriculum/refresh', methods=['POST'])
+def refresh_curriculum():
+    """
+    Recarga el pensum en memoria (tras un cambio de currículo) y vacía la caché de
+    recomendaciones. Con SHARED_STATE_PATH los demás workers hacen lo mismo en su
+    siguiente solicitud; sin él, solo el worker que responde.
+    """
+    if not motor_curricular:
+        return jsonify({"error": "El motor curricular en memoria no está activo."}), 409
+    try:
+        modelo = motor_curricular.refrescar(anunciar=True)
+    except Exception as e:
+        print(f"Error al refrescar el pensum: {e}")
+        return jsonify({"error": "No se pudo recargar el pensum."}), 500
+    if cache_recomendaciones:
+        cache_recomendaciones.limpiar()
+    return jsonify({"cursos": len(modelo), "electivas": len(modelo.electivas),
+                    "allWorkers": bool(generaciones and generaciones.compartidas)}), 200
+
+# --- Caché de transcripciones por contenido ---
+# Clave: SHA-256 de los bytes del PDF, más la versión del parser (funtions.VERSION_PARSER)
+# y la configuración de extracción, que también cambian el resultado. Un duplicado exacto
+# reutiliza el resultado parseado y, si ya quedó registrado en Neo4j, también se omite la escritura.
+PDF_CACHE_SIZE = int(os.getenv('PDF_CACHE_SIZE', 1000))
+PDF_CACHE_TTL = float(os.getenv('PDF_CACHE_TTL', 0)) or None
+PDF_CACHE_PATH = os.getenv('PDF_CACHE_PATH')
+
+def _huella_pdf(datos_pdf):
+    extraccion = "rapida" if PDF_FAST_EXTRACTION else "completa"
+    return f"{hashlib.sha256(datos_pdf).hexdigest()}:{VERSION_PARSER}:{extraccion}:{PDF_MAX_PAGES}"
+
+def _resultado_duplicado():
+    """resultado_neo4j de un PDF idéntico a uno ya registrado (no se vuelve a escribir)."""
+    return {"exito": True, "filas_escritas": 0, "filas_omitidas": 0, "omitidas": [], "duplicado": True}
+
+def _transcripcion_ingestada(huella):
+    """Datos parseados de un PDF idéntico ya registrado en Neo4j, o None."""
+    if not cache_transcripciones:
+        return None
+    en_cache = cache_transcripciones.obtener(huella)
+    if en_cache is not None and en_cache["ingestado"]:
+        return en_cache["datos_parseados"]
+    return None
+
+def _procesar_transcripcion(datos_pdf, nombre_archivo):
+    """
+    Extrae, parsea y registra en Neo4j un PDF (bytes).
+    Devuelve (datos_parseados, resultado_neo4j), o (None, None) si no se pudo extraer texto.
+    """
+    huella = _huella_pdf(datos_pdf)
+    # La consulta que cuenta para las métricas es la del endpoint; aquí solo se reutiliza
+    en_cache = cache_transcripciones.obtener(huella, contar=False) if cache_transcripciones else None
+    if en_cache is not None:
+        datos_parseados = en_cache["datos_parseados"]
+        if en_cache["ingestado"]:
+            logger.info(f"PDF {nombre_archivo} idéntico a uno ya registrado; se omite la escritura en Neo4j.")
+            return datos_parseados, _resultado_duplicado()
+        datos_parseados, resultado_neo4j = _registrar_transcripcion(datos_parseados, nombre_archivo)
+    else:
+        with ETAPAS_PDF.medir(stage="extract"):
+            texto_extraido = extraer_texto_de_pdf(io.BytesIO(datos_pdf),
+                                                  paralelo=PDF_EXTRACTION_WORKERS > 0,
+                                                  max_workers=PDF_EXTRACTION_WORKERS or None,
+                                                  max_paginas=PDF_MAX_PAGES,
+                                                  rapido=PDF_FAST_EXTRACTION)
+        
+        if texto_extraido is None:
+            return None, None
+
+        with ETAPAS_PDF.medir(stage="parse"):
+            datos_parseados = parse_notas_desde_texto(texto_extraido)
+        
+        if not datos_parseados.get("informacion_estudiante") or not datos_parseados.get("informacion_estudiante").get("nombre"):
+             logger.warning("Advertencia (Flask Endpoint): La información del estudiante parece incompleta después del parseo.")
+
+        datos_parseados, resultado_neo4j = _registrar_transcripcion(datos_parseados, nombre_archivo)
+
+    if cache_transcripciones:
+        cache_transcripciones.guardar(huella, {
+            "datos_parseados": datos_parseados,
+            "ingestado": bool(resultado_neo4j and resultado_neo4j["exito"])
+        })
+    return datos_parseados, resultado_neo4j
+
+def _registrar_transcripcion(datos_parseados, nombre_archivo):
+    """Escribe en Neo4j una transcripción ya parseada; devuelve (datos_parseados, resultado_neo4j)."""
+    # --- INICIO: INTEGRACIÓN CON NEO4J (USANDO EL DRIVER GLOBAL) ---
+    resultado_neo4j = None
+    if driver: # Verificar que el driver se inicializó correctamente
+        try:
+            # Pasar la instancia global del driver a la función (una sola transacción)
+            with ETAPAS_PDF.medir(stage="neo4j_write"):
+                resultado_neo4j = registrar_estudiante_y_cursos_en_neo4j_lote(driver, datos_parseados)
+            
+            if resultado_neo4j["exito"]:
+                logger.info(f"Datos del PDF {nombre_archivo} procesados e insertados/actualizados en Neo4j correctamente: "
+                                f"{resultado_neo4j['filas_escritas']} cursos escritos, {resultado_neo4j['filas_omitidas']} omitidos.")
+                for omitida in resultado_neo4j["omitidas"]:
+                    logger.warning(f"Curso omitido del PDF {nombre_archivo}: {omitida}")
+            else:
+                logger.error(f"Hubo problemas al insertar/actualizar datos del PDF {nombre_archivo} en Neo4j: {resultado_neo4j.get('error')}")
+        except Exception as e_neo4j_call: # Capturar cualquier excepción inesperada de la llamada
+            logger.error(f"Error CRÍTICO durante la llamada a la función de Neo4j para {nombre_archivo}: {e_neo4j_call}", exc_info=True)
+    else:
+        logger.error("El driver de Neo4j no está disponible. No se intentó la inserción en la base de datos.")
+
+    return datos_parseados, resultado_neo4j
+
+def _procesar_trabajo_pdf(ruta_pdf, nombre_archivo):
+    """Procesador de la cola de ingesta: el resultado queda en el estado del trabajo."""
+    with open(ruta_pdf, 'rb') as f:
+        datos_pdf = f.read()
+    datos_parseados, resultado_neo4j = _procesar_transcripcion(datos_pdf, nombre_archivo)
+    if datos_parseados is None:
+        raise ValueError("No se pudo extraer texto del PDF. El archivo podría estar corrupto o vacío.")
+    return {"datos_parseados": datos_parseados, "resultado_neo4j": resultado_neo4j}
+
+# --- Cola de ingesta asíncrona ---
+# Con PDF_ASYNC_INGEST=1 (por defecto) /procesar-pdf guarda el archivo en PDF_SPOOL_DIR y
+# responde de inmediato con el id del trabajo; ?sync=1 conserva el procesamiento síncrono.
+PDF_ASYNC_INGEST = os.getenv('PDF_ASYNC_INGEST', '1') == '1'
+PDF_SPOOL_DIR = os.getenv('PDF_SPOOL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool'))
+PDF_QUEUE_WORKERS = int(os.getenv('PDF_QUEUE_WORKERS', 2))
+PDF_QUEUE_CAPACITY = int(os.getenv('PDF_QUEUE_CAPACITY', 100))
+
+@api.route('/procesar-pdf', methods=['POST'])
 def procesar_pdf_endpoint():
     if 'file' not in request.files:
         return jsonify({"error": "No se encontró el parámetro 'file' en la solicitud."}), 400
@@ -169,39 +623,203 @@ def procesar_pdf_endpoint():
         return jsonify({"error": "No se seleccionó ningún archivo."}), 400
         
     if archivo and archivo.filename.lower().endswith('.pdf'):
+        datos_pdf = archivo.read()
+        asincrono = cola_ingesta and request.args.get('sync') != '1'
+        # Duplicado exacto de un PDF ya registrado: se responde con el resultado guardado,
+        # con la misma forma que un PDF nuevo (en modo asíncrono, un trabajo ya terminado)
+        datos_duplicado = _transcripcion_ingestada(_huella_pdf(datos_pdf))
+        if datos_duplicado is not None and not asincrono:
+            return jsonify(datos_duplicado), 200, {"X-Transcript-Cache": "hit"}
+
+        if asincrono:
+            try:
+                if datos_duplicado is not None:
+                    trabajo = cola_ingesta.registrar_completado(archivo.filename, {
+                        "datos_parseados": datos_duplicado,
+                        "resultado_neo4j": _resultado_duplicado()
+                    })
+                else:
+                    trabajo = cola_ingesta.enviar(datos_pdf, archivo.filename)
+            except ColaLlena:
+                return jsonify({"error": "La cola de procesamiento de PDFs está llena. Intenta de nuevo en unos segundos."}), 429, {"Retry-After": "5"}
+            except Exception as e:
+                logger.error(f"Error encolando el PDF {archivo.filename}: {e}", exc_info=True)
+                return jsonify({"error": f"Ocurrió un error interno al encolar el PDF: {str(e)}"}), 500
+            return jsonify({
+                "jobId": trabajo["jobId"],
+                "status": trabajo["status"],
+                "statusUrl": url_for('api.get_pdf_job', job_id=trabajo["jobId"])
+            }), 202, {"X-Transcript-Cache": "hit" if datos_duplicado is not None else "miss"}
+
         try:
-            texto_extraido = extraer_texto_de_pdf(archivo.stream) 
+            datos_parseados, _ = _procesar_transcripcion(datos_pdf, archivo.filename)
             
-            if texto_extraido is None:
+            if datos_parseados is None:
                 return jsonify({"error": "No se pudo extraer texto del PDF. El archivo podría estar corrupto o vacío."}), 500
 
-            datos_parseados = parse_notas_desde_texto(texto_extraido)
-            
-            if not datos_parseados.get("informacion_estudiante") or not datos_parseados.get("informacion_estudiante").get("nombre"):
-                 app.logger.warning("Advertencia (Flask Endpoint): La información del estudiante parece incompleta después del parseo.")
-
-            # --- INICIO: INTEGRACIÓN CON NEO4J (USANDO EL DRIVER GLOBAL) ---
-            if driver: # Verificar que el driver se inicializó correctamente
-                try:
-                    # Pasar la instancia global del driver a la función
-                    exito_neo4j = registrar_estudiante_y_cursos_en_neo4j(driver, datos_parseados) 
-                    
-                    if exito_neo4j:
-                        app.logger.info(f"Datos del PDF {archivo.filename} procesados e insertados/actualizados en Neo4j correctamente.")
-                    else:
-                        app.logger.error(f"Hubo problemas al insertar/actualizar datos del PDF {archivo.filename} en Neo4j. Revisa logs.")
-                except Exception as e_neo4j_call: # Capturar cualquier excepción inesperada de la llamada
-                    app.logger.error(f"Error CRÍTICO durante la llamada a la función de Neo4j para {archivo.filename}: {e_neo4j_call}", exc_info=True)
-            else:
-                app.logger.error("El driver de Neo4j no está disponible. No se intentó la inserción en la base de datos.")
-
             return jsonify(datos_parseados), 200
             
         except Exception as e:
-            app.logger.error(f"Error procesando el PDF {archivo.filename}: {e}", exc_info=True)
+            logger.error(f"Error procesando el PDF {archivo.filename}: {e}", exc_info=True)
             return jsonify({"error": f"Ocurrió un error interno al procesar el PDF: {str(e)}"}), 500
     else:
         return jsonify({"error": "El archivo debe ser un PDF."}), 400
 
+@api.route('/procesar-pdf/cache/stats', methods=['GET'])
+def get_pdf_cache_stats():
+    """Contadores de la caché de transcripciones por contenido (del worker que atiende la solicitud)."""
+    if not cache_transcripciones:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **cache_transcripciones.estadisticas()}), 200
+
+@api.route('/procesar-pdf/jobs/<string:job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    """Estado de un trabajo de ingesta: pending, processing, done (con el resultado) o failed."""
+    if not cola_ingesta:
+        return jsonify({"error": "La cola de ingesta asíncrona no está activa."}), 409
+    trabajo = cola_ingesta.estado(job_id)
+    if trabajo is None:
+        return jsonify({"error": f"Trabajo '{job_id}' no encontrado."}), 404
+    return jsonify(trabajo), 200
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Histogramas de tiempos en formato de texto de Prometheus (del worker que atiende la solicitud)."""
+    return Response(registro.exponer(), content_type=CONTENT_TYPE)
+
+@api.route('/health', methods=['GET'])
+def health():
+    """Liveness: el proceso responde."""
+    return jsonify({"status": "ok"}), 200
+
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: Neo4j es alcanzable desde este worker (y el pensum está cargado, si aplica)."""
+    estado = {"neo4j": False}
+    try:
+        if driver:
+            driver.verify_connectivity()
+            estado["neo4j"] = True
+    except Exception as e:
+        estado["error"] = str(e)
+    if motor_curricular:
+        estado["curriculum_loaded"] = motor_curricular.cargado_en > 0
+    listo = estado["neo4j"] and estado.get("curriculum_loaded", True)
+    estado["status"] = "ready" if listo else "unavailable"
+    return jsonify(estado), 200 if listo else 503
+
+# --- Ciclo de vida de los recursos por proceso ---
+def iniciar_servicios():
+    """
+    Crea el driver de Neo4j, el motor curricular, las cachés y la cola de ingesta de
+    este proceso. Con gunicorn se llama en cada worker después del fork (ver gunicorn.conf.py),
+    para que ningún worker herede conexiones ni hilos del proceso maestro.
+    """
+    global driver, motor_curricular, cache_recomendaciones, cache_transcripciones, cola_ingesta, generaciones
+
+    generaciones = Generaciones(SHARED_STATE_PATH)
+
+    # Crear el driver de Neo4j una sola vez por proceso
+    try:
+        driver = crear_driver()
+    except Exception as e:
+        print(f"Error al crear el driver de Neo4j: {e}")
+        driver = None # Marcar como no conectado si falla (p. ej. URI inválido)
+    conectado = False
+    if driver:
+        try:
+            driver.verify_connectivity() # Comprueba la conexión al iniciar
+            conectado = True
+            print("Conexión a Neo4j establecida.")
+        except Exception as e:
+            # El driver se conserva y reconecta solo; /ready informa hasta que Neo4j responda
+            print(f"Error al conectar a Neo4j: {e}")
+
+    if conectado and NEO4J_ENSURE_SCHEMA:
+        try:
+            # Sin espera: los índices nuevos se pueblan en segundo plano
+            informe = asegurar_esquema(driver, espera=0)
+            for nombre, error in informe["errores"].items():
+                print(f"Error al aplicar el esquema ({nombre}): {error}")
+            if informe["faltantes"]:
+                print(f"Índices de Neo4j faltantes o no disponibles aún: {', '.join(informe['faltantes'])}")
+        except Exception as e:
+            print(f"Error al verificar el esquema de Neo4j: {e}")
+
+    if driver and RECOMMENDATION_ENGINE == 'local':
+        motor_curricular = MotorCurricular(
+            driver, intervalo_refresco=CURRICULUM_REFRESH_SECONDS,
+            observar_etapa=lambda etapa, segundos: ETAPAS_RECOMENDACION.observar(segundos, engine="local", stage=etapa),
+            generaciones=generaciones)
+        # Sin conexión, el pensum se carga en la primera solicitud que lo necesite
+        if conectado:
+            try:
+                modelo = motor_curricular.refrescar()
+                print(f"Pensum cargado en memoria: {len(modelo)} cursos, {len(modelo.electivas)} electivas candidatas.")
+            except Exception as e:
+                print(f"Error al cargar el pensum en memoria: {e}")
+
+    if motor_curricular and ELIGIBILITY_MATERIALIZED:
+        # Antes que la invalidación de la caché: una lectura posterior a la invalidación
+        # ya encuentra la elegibilidad recalculada
+        registrar_observador_ingesta(_materializar_elegibilidad)
+
+    if RECOMMENDATION_CACHE_SIZE > 0:
+        cache_recomendaciones = CacheLRU(capacidad=RECOMMENDATION_CACHE_SIZE,
+                                         ttl=RECOMMENDATION_CACHE_TTL,
+                                         ruta_compartida=RECOMMENDATION_CACHE_PATH,
+                                         nombre="recomendaciones",
+                                         generaciones=generaciones)
+        registrar_observador_ingesta(lambda student_id, _: cache_recomendaciones.invalidar_grupo(student_id))
+
+    if PDF_CACHE_SIZE > 0:
+        cache_transcripciones = CacheLRU(capacidad=PDF_CACHE_SIZE,
+                                         ttl=PDF_CACHE_TTL,
+                                         ruta_compartida=PDF_CACHE_PATH,
+                                         nombre="transcripciones",
+                                         generaciones=generaciones)
+
+    if PDF_ASYNC_INGEST:
+        try:
+            cola_ingesta = ColaIngesta(PDF_SPOOL_DIR, _procesar_trabajo_pdf,
+                                       max_workers=PDF_QUEUE_WORKERS, capacidad=PDF_QUEUE_CAPACITY)
+            cola_ingesta.iniciar()
+        except Exception as e:
+            print(f"Error al iniciar la cola de ingesta, /procesar-pdf será síncrono: {e}")
+            cola_ingesta = None
+
+def _materializar_elegibilidad(student_id, _):
+    """Observador de ingesta: recalcula las relaciones ELIGIBLE_FOR del estudiante."""
+    try:
+        materializar_estudiantes(driver, motor_curricular.modelo, [student_id], ELIGIBILITY_PASSING_GRADE)
+    except Exception as e:
+        logger.error(f"Error materializando la elegibilidad del estudiante {student_id}: {e}")
+
+def detener_servicios():
+    """Detiene la cola de ingesta y el pool de extracción y cierra el driver de Neo4j de este proceso."""
+    global driver, cola_ingesta
+    if cola_ingesta:
+        cola_ingesta.detener(timeout=30)
+        cola_ingesta = None
+    cerrar_pool_extraccion()
+    if driver:
+        print("Cerrando conexión a Neo4j.")
+        driver.close()
+        driver = None
+
+def create_app(iniciar=True):
+    """
+    Fábrica de la aplicación. Con iniciar=False no se abren conexiones (gunicorn con
+    preload_app crea la app en el proceso maestro y cada worker llama a iniciar_servicios()).
+    """
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    # Acceder a app.logger hace que Flask configure su handler sobre `logger`
+    app.logger.debug("Aplicación creada.")
+    if iniciar:
+        iniciar_servicios()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -11,77 +11,210 @@ def _convertir_periodo_a_formato_semestre(periodo_str):
         elif "segundo" in periodo_tipo: return f"{año}-2"
     return periodo_str 
 
-def registrar_estudiante_y_cursos_en_neo4j(driver_instance, datos_estudiante):
+# Consulta única de ingesta: el MERGE del estudiante y todas las relaciones TOOK
+# viajan en una sola transacción. Cada fila de $filas lleva un índice para poder
+# informar qué cursos no existen en el grafo (se omiten en lugar de fallar).
+# took_version cambia con cada ingesta: permite detectar elegibilidades materializadas
+# que quedaron desactualizadas (ver elegibilidad.py).
+QUERY_INGESTA_LOTE = """
+MERGE (s:Student {studentId: $studentId})
+ON CREATE SET s.name = $studentName
+SET s.took_version = coalesce(s.took_version, 0) + 1
+WITH s
+UNWIND $filas AS fila
+OPTIONAL MATCH (c:Course {courseId: fila.courseId})
+FOREACH (_ IN CASE WHEN c IS NULL THEN [] ELSE [1] END |
+    MERGE (s)-[r:TOOK {semester_taken: fila.semester_taken}]->(c)
+    SET r.grade = toFloat(fila.grade)
+)
+RETURN fila.idx AS idx, c IS NOT NULL AS escrita
+"""
+
+# Variante para muchos estudiantes (reingesta masiva): cada elemento de $estudiantes
+# lleva su índice, código, nombre y sus filas TOOK.
+QUERY_INGESTA_MULTIPLE = """
+UNWIND $estudiantes AS est
+MERGE (s:Student {studentId: est.studentId})
+ON CREATE SET s.name = est.studentName
+SET s.took_version = coalesce(s.took_version, 0) + 1
+WITH s, est
+UNWIND est.filas AS fila
+OPTIONAL MATCH (c:Course {courseId: fila.courseId})
+FOREACH (_ IN CASE WHEN c IS NULL THEN [] ELSE [1] END |
+    MERGE (s)-[r:TOOK {semester_taken: fila.semester_taken}]->(c)
+    SET r.grade = toFloat(fila.grade)
+)
+RETURN est.idx AS estIdx, fila.idx AS idx, c IS NOT NULL AS escrita
+"""
+
+# Funciones que se llaman con (student_id, resultado) después de cada ingesta exitosa
+# (p. ej. para invalidar cachés de recomendaciones del estudiante).
+_observadores_ingesta = []
+
+def registrar_observador_ingesta(callback):
+    """Suscribe `callback(student_id, resultado)` a las ingestas exitosas."""
+    _observadores_ingesta.append(callback)
+
+def _notificar_ingesta(student_id, resultado):
+    for callback in _observadores_ingesta:
+        try:
+            callback(student_id, resultado)
+        except Exception:
+            # Un observador con errores no debe invalidar una ingesta ya confirmada
+            pass
+
+def semestre_tomado(periodo_original, tipo_nota):
+    """Normaliza el periodo de un curso al formato 'AAAA-1', 'AAAA-2' o 'AAAA-V'."""
+    if tipo_nota and tipo_nota.lower() == "vacacional" and periodo_original:
+        year_match = re.search(r"(\d{4})", periodo_original)
+        return f"{year_match.group(1)}-V" if year_match else "FormatoDesconocido-V"
+    return _convertir_periodo_a_formato_semestre(periodo_original or "")
+
+def _preparar_filas_took(historial):
     """
-    Registra la información del estudiante y sus cursos en Neo4j.
-    Usa la instancia del driver global pasada como argumento.
-    No realiza logging interno.
+    Aplana el historial académico en filas para el UNWIND de QUERY_INGESTA_LOTE.
+    Devuelve (filas, omitidas); las omitidas son cursos sin código o sin nota.
+    """
+    filas = []
+    omitidas = []
+    for semestre_data in historial:
+        periodo_original = semestre_data.get("periodo")
+        for curso in semestre_data.get("cursos", []):
+            course_id = curso.get("codigo")
+            grade = curso.get("definitiva")
+            semester_taken = semestre_tomado(periodo_original, curso.get("tipo_nota"))
+            if not course_id or grade is None:
+                omitidas.append({"codigo": course_id, "semestre": semester_taken, "motivo": "datos_incompletos"})
+                continue
+            filas.append({
+                "idx": len(filas),
+                "courseId": course_id,
+                "grade": grade,
+                "semester_taken": semester_taken,
+            })
+    return filas, omitidas
+
+def _datos_ingesta(datos_estudiante):
+    """
+    (info_personal, filas, omitidas) de una salida de parse_notas_desde_texto o de una
+    registros.Transcripcion, que ya tiene los cursos en columnas y los semestres normalizados.
+    """
+    if hasattr(datos_estudiante, "filas_took"):
+        filas, omitidas = datos_estudiante.filas_took()
+        return datos_estudiante.informacion_estudiante(), filas, omitidas
+    filas, omitidas = _preparar_filas_took(datos_estudiante.get("historial_academico", []))
+    return datos_estudiante.get("informacion_estudiante", {}), filas, omitidas
+
+def _resultado_ingesta(exito, escritas=0, omitidas=None, error=None):
+    omitidas = omitidas or []
+    resultado = {
+        "exito": exito,
+        "filas_escritas": escritas,
+        "filas_omitidas": len(omitidas),
+        "omitidas": omitidas,
+    }
+    if error:
+        resultado["error"] = error
+    return resultado
+
+def registrar_estudiante_y_cursos_en_neo4j_lote(driver_instance, datos_estudiante):
+    """
+    Registra al estudiante y todas sus relaciones TOOK en una sola transacción
+    usando UNWIND (un único round trip por transcripción).
+
+    Devuelve un diccionario con el resultado por curso:
+    {"exito", "filas_escritas", "filas_omitidas", "omitidas": [{"codigo", "semestre", "motivo"}]}
+    donde motivo es 'datos_incompletos' o 'curso_inexistente'.
     """
     if not driver_instance:
-        # print("Error: El driver de Neo4j no está inicializado.") # Podrías usar print si es para depuración rápida
-        return False # O lanzar una excepción específica
+        return _resultado_ingesta(False, error="driver_no_inicializado")
 
-    info_personal = datos_estudiante.get("informacion_estudiante", {})
-    historial = datos_estudiante.get("historial_academico", [])
+    info_personal, filas, omitidas = _datos_ingesta(datos_estudiante)
 
     if not info_personal.get("codigo_estudiante") or not info_personal.get("nombre"):
-        # print("Error: Datos del estudiante incompletos para Neo4j.")
-        return False # O lanzar una excepción
+        return _resultado_ingesta(False, error="datos_estudiante_incompletos")
 
-    student_id = info_personal["codigo_estudiante"]
-    student_name = info_personal["nombre"]
+    def _escribir(tx):
+        result = tx.run(QUERY_INGESTA_LOTE,
+                        studentId=info_personal["codigo_estudiante"],
+                        studentName=info_personal["nombre"],
+                        filas=filas)
+        return [(record["idx"], record["escrita"]) for record in result]
 
-    # El bloque try-except principal se mantiene para manejar errores de sesión de Neo4j
-    # y devolver True/False, pero no logueará el error aquí.
     try:
         with driver_instance.session() as session:
-            query_estudiante = """
-            MERGE (s:Student {studentId: $studentId})
-            ON CREATE SET s.name = $studentName
-            """
-            session.run(query_estudiante, studentId=student_id, studentName=student_name)
-            # No hay logger.info aquí
-
-            for semestre_data in historial:
-                periodo_original = semestre_data.get("periodo")
-                cursos_semestre = semestre_data.get("cursos", [])
-                for curso in cursos_semestre:
-                    course_id = curso.get("codigo")
-                    grade = curso.get("definitiva")
-                    tipo_nota = curso.get("tipo_nota")
-                    if not course_id or grade is None:
-                        # No hay logger.warning aquí
-                        continue
-                    
-                    semester_taken = ""
-                    if tipo_nota and tipo_nota.lower() == "vacacional" and periodo_original:
-                        year_match = re.search(r"(\d{4})", periodo_original)
-                        semester_taken = f"{year_match.group(1)}-V" if year_match else "FormatoDesconocido-V"
-                    else:
-                        semester_taken = _convertir_periodo_a_formato_semestre(periodo_original)
-
-                    query_relacion = """
-                    MATCH (s:Student {studentId: $studentId})
-                    MATCH (c:Course {courseId: $courseId})
-                    MERGE (s)-[r:TOOK {semester_taken: $semester_taken}]->(c)
-                    ON CREATE SET r.grade = toFloat($grade)
-                    ON MATCH SET r.grade = toFloat($grade)
-                    """
-                    # El try-except interno para la relación se mantiene para que un error
-                    # en un curso no detenga el procesamiento de otros, pero no loguea.
-                    try:
-                        session.run(query_relacion, 
-                                    studentId=student_id, courseId=course_id, 
-                                    grade=grade, semester_taken=semester_taken)
-                        # No hay logger.debug aquí
-                    except Exception as e_rel:
-                        # No hay logger.error aquí
-                        # Podrías decidir relanzar la excepción o simplemente continuar:
-                        # print(f"Error procesando relación para curso {course_id}: {e_rel}") # Para depuración
-                        pass # Continuar con el siguiente curso
-        return True
+            resultados = session.execute_write(_escribir)
     except Exception as e_session:
-        # No hay logger.error aquí
-        # La excepción se propagará si no la manejas aquí, o puedes devolver False.
-        # print(f"Error general en sesión Neo4j: {e_session}") # Para depuración
-        return False
\ No newline at end of file
+        return _resultado_ingesta(False, omitidas=omitidas, error=str(e_session))
+
+    escritas = 0
+    for idx, escrita in resultados:
+        if escrita:
+            escritas += 1
+        else:
+            fila = filas[idx]
+            omitidas.append({"codigo": fila["courseId"], "semestre": fila["semester_taken"], "motivo": "curso_inexistente"})
+    resultado = _resultado_ingesta(True, escritas, omitidas)
+    _notificar_ingesta(info_personal["codigo_estudiante"], resultado)
+    return resultado
+
+def registrar_estudiantes_en_neo4j_lote(driver_instance, lista_datos_estudiantes):
+    """
+    Registra muchos estudiantes (cada uno con el formato de parse_notas_desde_texto
+    o como registros.Transcripcion) en una sola transacción. Devuelve una lista de resultados, alineada con la
+    entrada, con el mismo formato que registrar_estudiante_y_cursos_en_neo4j_lote.
+    """
+    resultados = [None] * len(lista_datos_estudiantes)
+    if not driver_instance:
+        return [_resultado_ingesta(False, error="driver_no_inicializado") for _ in resultados]
+
+    estudiantes = []
+    filas_por_estudiante = {}
+    omitidas_por_estudiante = {}
+    for est_idx, datos_estudiante in enumerate(lista_datos_estudiantes):
+        info_personal, filas, omitidas = _datos_ingesta(datos_estudiante)
+        if not info_personal.get("codigo_estudiante") or not info_personal.get("nombre"):
+            resultados[est_idx] = _resultado_ingesta(False, error="datos_estudiante_incompletos")
+            continue
+        filas_por_estudiante[est_idx] = filas
+        omitidas_por_estudiante[est_idx] = omitidas
+        estudiantes.append({
+            "idx": est_idx,
+            "studentId": info_personal["codigo_estudiante"],
+            "studentName": info_personal["nombre"],
+            "filas": filas,
+        })
+
+    def _escribir(tx):
+        result = tx.run(QUERY_INGESTA_MULTIPLE, estudiantes=estudiantes)
+        return [(record["estIdx"], record["idx"], record["escrita"]) for record in result]
+
+    try:
+        with driver_instance.session() as session:
+            filas_escritas = session.execute_write(_escribir) if estudiantes else []
+    except Exception as e_session:
+        for est_idx in filas_por_estudiante:
+            resultados[est_idx] = _resultado_ingesta(False, omitidas=omitidas_por_estudiante[est_idx], error=str(e_session))
+        return resultados
+
+    escritas = dict.fromkeys(filas_por_estudiante, 0)
+    for est_idx, idx, escrita in filas_escritas:
+        if escrita:
+            escritas[est_idx] += 1
+        else:
+            fila = filas_por_estudiante[est_idx][idx]
+            omitidas_por_estudiante[est_idx].append({"codigo": fila["courseId"], "semestre": fila["semester_taken"], "motivo": "curso_inexistente"})
+    for estudiante in estudiantes:
+        est_idx = estudiante["idx"]
+        resultados[est_idx] = _resultado_ingesta(True, escritas[est_idx], omitidas_por_estudiante[est_idx])
+        _notificar_ingesta(estudiante["studentId"], resultados[est_idx])
+    return resultados
+
+def registrar_estudiante_y_cursos_en_neo4j(driver_instance, datos_estudiante):
+    """
+    Registra la información del estudiante y sus cursos en Neo4j.
+    Usa la instancia del driver global pasada como argumento.
+    Mantiene la interfaz booleana; el detalle por curso está en
+    registrar_estudiante_y_cursos_en_neo4j_lote.
+    """
+    return registrar_estudiante_y_cursos_en_neo4j_lote(driver_instance, datos_estudiante)["exito"]
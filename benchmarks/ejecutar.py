@@ -0,0 +1,243 @@
+"""
+Benchmarks de parseo, extracción de PDFs, ingesta y recomendaciones sobre datos
+sintéticos y un grafo en memoria (no necesita Neo4j ni red).
+
+Cada ejecución agrega una línea al historial JSONL y compara el throughput de
+cada escenario con la mediana de las últimas ejecuciones con los mismos
+parámetros; una caída mayor que el umbral se informa como regresión.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.ejecutar
+    python -m benchmarks.ejecutar --escalas 100,1000,10000 --cursos 120 --estricto
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from bd_funtions import registrar_estudiante_y_cursos_en_neo4j_lote, registrar_estudiantes_en_neo4j_lote
+from curriculo import MotorCurricular
+from elegibilidad import leer_elegibilidad, reconstruir
+from funtions import extraer_texto_de_pdf, parse_notas_desde_texto
+
+from benchmarks.grafo_falso import DriverFalso, GrafoEnMemoria
+from benchmarks.sinteticos import generar_curriculo, generar_estudiantes, pdf_transcripcion, texto_transcripcion
+
+HISTORIAL_POR_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historial.jsonl")
+ESCENARIOS = ("parse", "extract_pdf", "extract_pdf_fast", "ingest", "ingest_batch", "recommend", "recommend_batch", "recommend_materialized")
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _medir(escenario, escala, items, operacion):
+    """Ejecuta operacion(item) para cada item y devuelve el resumen de throughput y latencias."""
+    latencias = []
+    gc.collect()
+    inicio = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        operacion(item)
+        latencias.append(time.perf_counter() - t0)
+    segundos = time.perf_counter() - inicio
+    return {
+        "escenario": escenario,
+        "escala": escala,
+        "items": len(latencias),
+        "segundos": round(segundos, 4),
+        "por_segundo": round(len(latencias) / segundos, 2) if segundos else None,
+        "p50_ms": round(_percentil(latencias, 50) * 1000, 3) if latencias else None,
+        "p95_ms": round(_percentil(latencias, 95) * 1000, 3) if latencias else None,
+        "max_ms": round(max(latencias) * 1000, 3) if latencias else None,
+    }
+
+
+def _bloques(lista, tamano):
+    return [lista[i:i + tamano] for i in range(0, len(lista), tamano)]
+
+
+def _por_estudiante(medicion, escala):
+    """En los escenarios por lote el throughput se expresa en estudiantes, no en lotes."""
+    medicion["items"] = escala
+    medicion["por_segundo"] = round(escala / medicion["segundos"], 2) if medicion["segundos"] else None
+    return medicion
+
+
+def ejecutar_escala(escala, args):
+    """Corre todos los escenarios seleccionados con `escala` estudiantes sintéticos."""
+    curriculo = generar_curriculo(args.cursos, args.densidad, args.fraccion_electivas, semilla=args.semilla)
+    estudiantes = generar_estudiantes(curriculo, escala, semilla=args.semilla)
+    resultados = []
+
+    if "parse" in args.escenarios:
+        textos = [texto_transcripcion(e) for e in estudiantes]
+        resultados.append(_medir("parse", escala, textos, parse_notas_desde_texto))
+
+    if {"extract_pdf", "extract_pdf_fast"} & set(args.escenarios):
+        # Renderizar PDFs es caro: se limita la cantidad por escala
+        pdfs = [pdf_transcripcion(e) for e in estudiantes[:args.max_pdfs]]
+        if "extract_pdf" in args.escenarios:
+            resultados.append(_medir("extract_pdf", escala, pdfs, lambda datos: extraer_texto_de_pdf(io.BytesIO(datos))))
+        if "extract_pdf_fast" in args.escenarios:
+            resultados.append(_medir("extract_pdf_fast", escala, pdfs,
+                                     lambda datos: extraer_texto_de_pdf(io.BytesIO(datos), rapido=True)))
+
+    latencia = args.latencia_ms / 1000
+    grafo = None  # grafo ya poblado que reutilizan los escenarios de recomendación
+
+    if "ingest" in args.escenarios:
+        grafo = GrafoEnMemoria(curriculo)
+        driver_falso = DriverFalso(grafo, latencia=latencia)
+        resultados.append(_medir("ingest", escala, estudiantes,
+                                 lambda datos: registrar_estudiante_y_cursos_en_neo4j_lote(driver_falso, datos)))
+
+    if "ingest_batch" in args.escenarios:
+        grafo_lote = GrafoEnMemoria(curriculo)
+        driver_lote = DriverFalso(grafo_lote, latencia=latencia)
+        medicion = _medir("ingest_batch", escala, _bloques(estudiantes, args.lote),
+                          lambda bloque: registrar_estudiantes_en_neo4j_lote(driver_lote, bloque))
+        resultados.append(_por_estudiante(medicion, escala))
+        grafo = grafo or grafo_lote
+
+    if not {"recommend", "recommend_batch", "recommend_materialized"} & set(args.escenarios):
+        return resultados
+    if grafo is None:
+        grafo = GrafoEnMemoria(curriculo)
+        registrar_estudiantes_en_neo4j_lote(DriverFalso(grafo), estudiantes)
+    motor = MotorCurricular(DriverFalso(grafo, latencia=latencia))
+    motor.refrescar()
+    student_ids = [e["informacion_estudiante"]["codigo_estudiante"] for e in estudiantes]
+
+    if "recommend" in args.escenarios:
+        resultados.append(_medir("recommend", escala, student_ids, lambda sid: motor.recomendar(sid, 3.0)))
+
+    if "recommend_batch" in args.escenarios:
+        medicion = _medir("recommend_batch", escala, _bloques(student_ids, args.lote),
+                          lambda bloque: motor.modelo.recomendar_lote(motor.filas_estudiantes(bloque), 3.0))
+        resultados.append(_por_estudiante(medicion, escala))
+
+    if "recommend_materialized" in args.escenarios:
+        # La reconstrucción no se mide: es el costo que se paga en la ingesta
+        driver_motor = motor.driver
+        reconstruir(driver_motor, motor.modelo, 3.0, lote=args.lote)
+        resultados.append(_medir("recommend_materialized", escala, student_ids,
+                                 lambda sid: leer_elegibilidad(driver_motor, sid, 3.0, motor.modelo)))
+
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def leer_historial(ruta):
+    if not os.path.exists(ruta):
+        return []
+    ejecuciones = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                ejecuciones.append(json.loads(linea))
+            except ValueError:
+                continue
+    return ejecuciones
+
+
+def comparar(resultados, historial, parametros, ventana=5, umbral=0.2):
+    """
+    Compara cada resultado con la mediana de throughput de las últimas `ventana`
+    ejecuciones con los mismos parámetros. Devuelve la lista de comparaciones;
+    `regresion` es True si el throughput cayó más de `umbral` (fracción).
+    """
+    comparables = [e for e in historial if e.get("parametros") == parametros]
+    comparaciones = []
+    for resultado in resultados:
+        previos = [
+            r["por_segundo"]
+            for e in comparables[-ventana:]
+            for r in e["resultados"]
+            if r["escenario"] == resultado["escenario"] and r["escala"] == resultado["escala"] and r["por_segundo"]
+        ]
+        referencia = statistics.median(previos) if previos else None
+        cambio = resultado["por_segundo"] / referencia - 1 if referencia and resultado["por_segundo"] else None
+        comparaciones.append(dict(resultado,
+                                  referencia=referencia,
+                                  cambio=round(cambio, 4) if cambio is not None else None,
+                                  regresion=cambio is not None and cambio < -umbral))
+    return comparaciones
+
+
+def _imprimir(comparaciones):
+    print(f"{'escenario':<24}{'escala':>8}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'vs. hist.':>11}", file=sys.stderr)
+    for c in comparaciones:
+        cambio = f"{c['cambio']:+.1%}" if c["cambio"] is not None else "-"
+        marca = "  REGRESIÓN" if c["regresion"] else ""
+        print(f"{c['escenario']:<24}{c['escala']:>8}{c['por_segundo']:>12}{c['p50_ms']:>10}{c['p95_ms']:>10}{cambio:>11}{marca}",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline con datos sintéticos y un grafo en memoria.")
+    parser.add_argument("--escalas", default="100,1000", help="Cantidades de estudiantes, separadas por comas")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS), help=f"Subconjunto de: {', '.join(ESCENARIOS)}")
+    parser.add_argument("--cursos", type=int, default=60, help="Cursos del pensum sintético")
+    parser.add_argument("--densidad", type=float, default=0.05, help="Probabilidad de prerrequisito entre cada par de cursos")
+    parser.add_argument("--fraccion-electivas", type=float, default=0.2, help="Fracción de cursos que son electivas")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--max-pdfs", type=int, default=200, help="Máximo de PDFs a extraer por escala")
+    parser.add_argument("--lote", type=int, default=200, help="Estudiantes por lote en los escenarios *_batch")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Round trip simulado por consulta al grafo")
+    parser.add_argument("--historial", default=HISTORIAL_POR_DEFECTO, help="Archivo JSONL con las ejecuciones anteriores")
+    parser.add_argument("--sin-historial", action="store_true", help="No agrega esta ejecución al historial")
+    parser.add_argument("--ventana", type=int, default=5, help="Ejecuciones anteriores contra las que se compara")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Caída de throughput que se considera regresión")
+    parser.add_argument("--estricto", action="store_true", help="Termina con código 1 si hay regresiones")
+    args = parser.parse_args(argv)
+    args.escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    parametros = {
+        "cursos": args.cursos, "densidad": args.densidad, "fraccion_electivas": args.fraccion_electivas,
+        "semilla": args.semilla, "max_pdfs": args.max_pdfs, "lote": args.lote, "latencia_ms": args.latencia_ms,
+    }
+    resultados = []
+    for escala in (int(e) for e in args.escalas.split(",")):
+        resultados.extend(ejecutar_escala(escala, args))
+
+    comparaciones = comparar(resultados, leer_historial(args.historial), parametros, args.ventana, args.umbral)
+    _imprimir(comparaciones)
+
+    if not args.sin_historial:
+        ejecucion = {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "maquina": platform.machine(),
+            "parametros": parametros,
+            "resultados": resultados,
+        }
+        with open(args.historial, "a", encoding="utf-8") as f:
+            f.write(json.dumps(ejecucion, ensure_ascii=False) + "\n")
+
+    regresiones = [c for c in comparaciones if c["regresion"]]
+    return 1 if regresiones and args.estricto else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Sustituto en memoria de Neo4j para los benchmarks.
+
+DriverFalso imita la parte de la API del driver oficial que usa el proyecto
+(session(), execute_read/execute_write, run(), data(), values(), single(),
+consume()) y reconoce las consultas conocidas por su texto exacto. Cada consulta
+se resuelve en Python sobre GrafoEnMemoria, con la misma semántica que el Cypher
+correspondiente. `latencia` simula el round trip de red de cada consulta.
+"""
+import threading
+import time
+
+from bd_funtions import QUERY_INGESTA_LOTE, QUERY_INGESTA_MULTIPLE
+from curriculo import CURRICULUM_QUERY, STUDENT_GRADES_QUERY, STUDENTS_GRADES_QUERY
+from elegibilidad import ALL_STUDENTS_QUERY, ELIGIBILITY_QUERY, MATERIALIZATION_GRADES_QUERY, MATERIALIZE_QUERY
+
+
+class GrafoEnMemoria:
+    def __init__(self, curriculo=()):
+        self.cursos = {}  # courseId -> registro con la forma de CURRICULUM_QUERY
+        self.estudiantes = {}  # studentId -> nombre
+        self.tomo = {}  # studentId -> {(courseId, semester_taken): grade}
+        self.version_took = {}  # studentId -> took_version
+        self.elegibilidad = {}  # studentId -> propiedades eligibility_* y lista ELIGIBLE_FOR
+        self.lock = threading.Lock()
+        for curso in curriculo:
+            self.cursos[curso["courseId"]] = dict(curso)
+
+    def relaciones_took(self):
+        return sum(len(tomados) for tomados in self.tomo.values())
+
+    # --- Consultas ---
+    def curriculo(self, _):
+        return [dict(curso, prerequisites=list(curso["prerequisites"])) for curso in self.cursos.values()]
+
+    def _filas_estudiante(self, student_id):
+        if student_id not in self.estudiantes:
+            return []
+        tomados = self.tomo.get(student_id)
+        if not tomados:
+            return [{"courseId": None, "grade": None}]  # OPTIONAL MATCH sin cursos
+        return [{"courseId": course_id, "grade": grade} for (course_id, _), grade in tomados.items()]
+
+    def notas_estudiante(self, parametros):
+        with self.lock:
+            return self._filas_estudiante(parametros["targetStudentId"])
+
+    def notas_estudiantes(self, parametros):
+        with self.lock:
+            # Mismo orden de columnas que la consulta: values() depende de él
+            return [{"studentId": sid, **fila}
+                    for sid in parametros["studentIds"]
+                    for fila in self._filas_estudiante(sid)]
+
+    def _ingestar(self, student_id, nombre, filas):
+        self.estudiantes.setdefault(student_id, nombre)  # ON CREATE SET
+        self.version_took[student_id] = self.version_took.get(student_id, 0) + 1
+        tomados = self.tomo.setdefault(student_id, {})
+        registros = []
+        for fila in filas:
+            existe = fila["courseId"] in self.cursos
+            if existe:
+                tomados[(fila["courseId"], fila["semester_taken"])] = float(fila["grade"])
+            registros.append({"idx": fila["idx"], "escrita": existe})
+        return registros
+
+    def ingesta_lote(self, parametros):
+        with self.lock:
+            return self._ingestar(parametros["studentId"], parametros["studentName"], parametros["filas"])
+
+    def ingesta_multiple(self, parametros):
+        registros = []
+        with self.lock:
+            for est in parametros["estudiantes"]:
+                for registro in self._ingestar(est["studentId"], est["studentName"], est["filas"]):
+                    registros.append({"estIdx": est["idx"], **registro})
+        return registros
+
+    def todos_los_estudiantes(self, _):
+        with self.lock:
+            return [{"studentId": sid} for sid in sorted(self.estudiantes)]
+
+    def notas_para_materializar(self, parametros):
+        with self.lock:
+            return [{"studentId": sid,
+                     "tookVersion": self.version_took.get(sid, 0),
+                     "filas": [[fila["courseId"], fila["grade"]] for fila in self._filas_estudiante(sid)]}
+                    for sid in parametros["studentIds"] if sid in self.estudiantes]
+
+    def materializar(self, parametros):
+        materializados = 0
+        with self.lock:
+            for est in parametros["estudiantes"]:
+                sid = est["studentId"]
+                if sid not in self.estudiantes or self.version_took.get(sid, 0) != est["tookVersion"]:
+                    continue
+                self.elegibilidad[sid] = {
+                    "passingGrade": parametros["passingGrade"],
+                    "curriculum": parametros["curriculum"],
+                    "eligibilityTookVersion": est["tookVersion"],
+                    "approvedCourses": est["approvedCourses"],
+                    "electivas": [e for e in est["electivas"] if e["id"] in self.cursos],
+                }
+                materializados += 1
+        return [{"materializados": materializados}]
+
+    def leer_elegibilidad(self, parametros):
+        sid = parametros["targetStudentId"]
+        with self.lock:
+            if sid not in self.estudiantes:
+                return []
+            guardada = self.elegibilidad.get(sid, {})
+            electivas = sorted(guardada.get("electivas", []), key=lambda e: e["rank"])
+            return [{
+                "tookVersion": self.version_took.get(sid, 0),
+                "eligibilityTookVersion": guardada.get("eligibilityTookVersion"),
+                "passingGrade": guardada.get("passingGrade"),
+                "curriculum": guardada.get("curriculum"),
+                "approvedCourses": guardada.get("approvedCourses"),
+                "recommendations": [{"id": e["id"], "name": self.cursos[e["id"]]["name"], "score": e["score"]}
+                                    for e in electivas],
+            }]
+
+
+_CONSULTAS = {
+    CURRICULUM_QUERY: GrafoEnMemoria.curriculo,
+    STUDENT_GRADES_QUERY: GrafoEnMemoria.notas_estudiante,
+    STUDENTS_GRADES_QUERY: GrafoEnMemoria.notas_estudiantes,
+    QUERY_INGESTA_LOTE: GrafoEnMemoria.ingesta_lote,
+    QUERY_INGESTA_MULTIPLE: GrafoEnMemoria.ingesta_multiple,
+    ALL_STUDENTS_QUERY: GrafoEnMemoria.todos_los_estudiantes,
+    MATERIALIZATION_GRADES_QUERY: GrafoEnMemoria.notas_para_materializar,
+    MATERIALIZE_QUERY: GrafoEnMemoria.materializar,
+    ELIGIBILITY_QUERY: GrafoEnMemoria.leer_elegibilidad,
+}
+
+
+class ResumenFalso:
+    profile = None
+    result_available_after = 0
+    result_consumed_after = 0
+
+
+class ResultadoFalso:
+    def __init__(self, registros):
+        self._registros = registros
+
+    def __iter__(self):
+        return iter(self._registros)
+
+    def data(self):
+        return [dict(registro) for registro in self._registros]
+
+    def values(self):
+        return [list(registro.values()) for registro in self._registros]
+
+    def value(self):
+        return [next(iter(registro.values())) for registro in self._registros]
+
+    def single(self):
+        return self._registros[0] if len(self._registros) == 1 else None
+
+    def consume(self):
+        return ResumenFalso()
+
+
+class TransaccionFalsa:
+    def __init__(self, driver_falso):
+        self._driver = driver_falso
+
+    def run(self, consulta, parameters=None, **parametros):
+        resolver = _CONSULTAS.get(consulta)
+        if resolver is None:
+            raise NotImplementedError(f"Consulta no soportada por el grafo en memoria: {consulta.strip()[:60]}...")
+        if self._driver.latencia:
+            time.sleep(self._driver.latencia)
+        self._driver.consultas += 1
+        return ResultadoFalso(resolver(self._driver.grafo, dict(parameters or {}, **parametros)))
+
+
+class SesionFalsa:
+    def __init__(self, driver_falso):
+        self._driver = driver_falso
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def run(self, consulta, parameters=None, **parametros):
+        return TransaccionFalsa(self._driver).run(consulta, parameters, **parametros)
+
+    def execute_read(self, unidad, *args, **kwargs):
+        return unidad(TransaccionFalsa(self._driver), *args, **kwargs)
+
+    execute_write = execute_read
+
+    def close(self):
+        pass
+
+
+class DriverFalso:
+    def __init__(self, grafo, latencia=0.0):
+        self.grafo = grafo
+        self.latencia = latencia
+        self.consultas = 0
+
+    def session(self, **_):
+        return SesionFalsa(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
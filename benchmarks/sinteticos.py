@@ -0,0 +1,185 @@
+"""
+Datos sintéticos para los benchmarks: pensum, historiales de estudiantes y reportes
+de notas (texto y PDF) en el formato que espera parse_notas_desde_texto.
+
+Todo es determinista para una misma semilla, de modo que dos ejecuciones del
+benchmark con los mismos parámetros miden exactamente el mismo trabajo.
+"""
+import random
+
+PERIODOS = ("Primer", "Segundo")
+CODIGO_BASE_CURSO = 1155000
+CODIGO_BASE_ESTUDIANTE = 1150000
+
+CABECERA = (
+    "Universidad Francisco de Paula Santander",
+    "División de Sistemas",
+    "Reporte de Notas Semestrales",
+)
+COLUMNAS = "Código Materia Tipo Nota Definitiva Habilitación"
+PIE = (
+    "Este reporte no es un certificado de notas.",
+    "Para trámites oficiales solicite el certificado en la Oficina de Admisiones y Registro.",
+    "Firma del director de programa",
+)
+
+
+def generar_curriculo(n_cursos=60, densidad=0.05, fraccion_electivas=0.2, semilla=0):
+    """
+    Pensum sintético con la forma de los registros de CURRICULUM_QUERY.
+
+    Los cursos se ordenan por nivel: cada curso solo puede requerir cursos anteriores
+    (con probabilidad `densidad` por par), así que los prerrequisitos forman un DAG.
+    La última `fraccion_electivas` de los cursos son electivas; una de cada cuatro es
+    sociohumanística y algunas exigen un mínimo de créditos.
+    """
+    rng = random.Random(semilla)
+    primera_electiva = n_cursos - int(n_cursos * fraccion_electivas)
+    cursos = []
+    for i in range(n_cursos):
+        electiva = i >= primera_electiva
+        cursos.append({
+            "courseId": str(CODIGO_BASE_CURSO + i),
+            "name": f"ASIGNATURA SINTETICA {i:04d}",
+            "credits": rng.choice((2, 3, 3, 4)),
+            "isElective": electiva,
+            "electiveType": rng.choice(("Professional", "Professional", None, "Sociohumanistic")) if electiva else None,
+            "minCreditsRequired": rng.choice((None, None, 60, 90)) if electiva else None,
+            "prerequisites": [cursos[j]["courseId"] for j in range(i) if rng.random() < densidad],
+        })
+    return cursos
+
+
+def _nota(rng):
+    return round(min(5.0, max(0.0, rng.gauss(3.6, 0.7))), 1)
+
+
+def generar_estudiantes(curriculo, n_estudiantes, cursos_por_semestre=6, semilla=0):
+    """
+    Transcripciones sintéticas con la forma de la salida de parse_notas_desde_texto.
+
+    Cada estudiante avanza por los cursos obligatorios en orden del pensum durante un
+    número aleatorio de semestres, repite los que pierde y toma algunas electivas;
+    de vez en cuando un curso se registra como vacacional.
+    """
+    rng = random.Random(semilla)
+    obligatorios = [c for c in curriculo if not c["isElective"]]
+    electivas = [c for c in curriculo if c["isElective"]]
+    estudiantes = []
+    for k in range(n_estudiantes):
+        semestres = rng.randint(1, 10)
+        anio = 2024 - semestres // 2
+        pendientes = list(obligatorios)
+        historial = []
+        creditos = 0
+        suma_notas = 0.0
+        for s in range(semestres):
+            cursos = []
+            cupo = cursos_por_semestre
+            if s >= 4 and electivas:
+                cupo -= 1
+                pendientes.append(rng.choice(electivas))
+            tomados, pendientes = pendientes[:cupo], pendientes[cupo:]
+            for curso in tomados:
+                nota = _nota(rng)
+                cursos.append({
+                    "codigo": curso["courseId"],
+                    "materia": curso["name"],
+                    "tipo_nota": "Vacacional" if rng.random() < 0.03 else "Definitiva",
+                    "definitiva": nota,
+                    "habilitacion": None,
+                })
+                suma_notas += nota
+                if nota >= 3.0:
+                    creditos += curso["credits"]
+                else:
+                    pendientes.insert(0, curso)
+            historial.append({"periodo": f"{PERIODOS[(s % 2)]} período de {anio + s // 2}", "cursos": cursos})
+        n_notas = sum(len(semestre["cursos"]) for semestre in historial)
+        estudiantes.append({
+            "informacion_estudiante": {
+                "nombre": f"ESTUDIANTE SINTETICO {k:06d}",
+                "codigo_estudiante": str(CODIGO_BASE_ESTUDIANTE + k),
+                "promedio_general": round(suma_notas / n_notas, 2) if n_notas else 0.0,
+                "creditos_aprobados_pensum": creditos,
+            },
+            "historial_academico": historial,
+        })
+    return estudiantes
+
+
+def lineas_transcripcion(datos, lineas_por_pagina=60, pie=False):
+    """
+    Líneas del reporte de notas de un estudiante, con los encabezados de página
+    que el parser descarta. Devuelve una lista de páginas (listas de líneas).
+    Con `pie=True` se agrega una última página sin notas (avisos y firmas).
+    """
+    info = datos["informacion_estudiante"]
+    cuerpo = [
+        f"Código: {info['codigo_estudiante']}",
+        f"Nombre: {info['nombre']}",
+        f"Promedio: {info['promedio_general']} Créditos aprobados Pensum: {info['creditos_aprobados_pensum']}",
+    ]
+    for semestre in datos["historial_academico"]:
+        cuerpo.append(semestre["periodo"])
+        cuerpo.append(COLUMNAS)
+        for curso in semestre["cursos"]:
+            habilitacion = "-" if curso["habilitacion"] is None else f"{curso['habilitacion']:.1f}"
+            cuerpo.append(f"{curso['codigo']} {curso['materia']} {curso['tipo_nota']} {curso['definitiva']:.1f} {habilitacion}")
+
+    por_pagina = lineas_por_pagina - len(CABECERA) - 2
+    bloques = [cuerpo[i:i + por_pagina] for i in range(0, len(cuerpo), por_pagina)] or [[]]
+    if pie:
+        bloques.append(list(PIE))
+    return [
+        list(CABECERA) + ["Generado: 2024-06-30"] + bloque + [f"pag {n} de {len(bloques)}"]
+        for n, bloque in enumerate(bloques, 1)
+    ]
+
+
+def texto_transcripcion(datos):
+    """Texto del reporte tal como lo devuelve extraer_texto_de_pdf."""
+    return "\n".join(linea for pagina in lineas_transcripcion(datos) for linea in pagina)
+
+
+def _escapar_pdf(linea):
+    datos = linea.encode("cp1252")
+    return datos.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def pdf_transcripcion(datos, lineas_por_pagina=60, pie=False):
+    """PDF mínimo (una fuente Helvetica, una línea de texto por renglón) del reporte de notas."""
+    objetos = []
+
+    def agregar(contenido):
+        objetos.append(contenido)
+        return len(objetos)
+
+    fuente = agregar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    paginas = lineas_transcripcion(datos, lineas_por_pagina, pie)
+    contenidos = []
+    for lineas in paginas:
+        operaciones = b"BT /F1 10 Tf 40 800 Td 12 TL\n" + b"".join(
+            b"(" + _escapar_pdf(linea) + b") Tj T*\n" for linea in lineas
+        ) + b"ET"
+        contenidos.append(agregar(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(operaciones), operaciones)))
+
+    id_paginas = len(objetos) + len(contenidos) + 1
+    hojas = [
+        agregar(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] /CropBox [0 0 612 842] "
+                b"/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> >> >>" % (id_paginas, contenido, fuente))
+        for contenido in contenidos
+    ]
+    agregar(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % h for h in hojas), len(hojas)))
+    catalogo = agregar(b"<< /Type /Catalog /Pages %d 0 R >>" % id_paginas)
+
+    salida = bytearray(b"%PDF-1.4\n")
+    desplazamientos = []
+    for numero, contenido in enumerate(objetos, 1):
+        desplazamientos.append(len(salida))
+        salida += b"%d 0 obj\n%s\nendobj\n" % (numero, contenido)
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % d for d in desplazamientos)
+    salida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, inicio_xref)
+    return bytes(salida)
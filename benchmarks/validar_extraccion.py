@@ -0,0 +1,92 @@
+"""
+Validación de la extracción rápida (extraer_texto_de_pdf(..., rapido=True)) contra
+la extracción completa sobre un corpus de referencia.
+
+Cada PDF se extrae por los dos caminos y se compara la salida de
+parse_notas_desde_texto; cualquier diferencia se informa con el nombre del PDF y
+termina con código 1. También se mide el tiempo de extracción de cada camino.
+El corpus puede ser un directorio (o .tar/.tar.gz) de reportes reales y/o PDFs
+sintéticos generados con benchmarks.sinteticos (la mitad con página de pie).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.validar_extraccion /ruta/a/pdfs
+    python -m benchmarks.validar_extraccion --sinteticos 200 --lineas-por-pagina 40
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+from funtions import extraer_texto_de_pdf, parse_notas_desde_texto
+from reingesta import _listar_pdfs
+
+from benchmarks.sinteticos import generar_curriculo, generar_estudiantes, pdf_transcripcion
+
+
+def _corpus(origenes, sinteticos, lineas_por_pagina, semilla):
+    """Genera (nombre, bytes) de cada PDF del corpus."""
+    for origen in origenes:
+        for clave, fuente in _listar_pdfs(origen):
+            if isinstance(fuente, bytes):
+                yield clave, fuente
+            else:
+                with open(fuente, "rb") as f:
+                    yield clave, f.read()
+    if sinteticos:
+        curriculo = generar_curriculo(semilla=semilla)
+        for k, datos in enumerate(generar_estudiantes(curriculo, sinteticos, semilla=semilla)):
+            yield f"sintetico-{k:06d}.pdf", pdf_transcripcion(datos, lineas_por_pagina, pie=k % 2 == 1)
+
+
+def _extraer(datos_pdf, rapido):
+    inicio = time.perf_counter()
+    texto = extraer_texto_de_pdf(io.BytesIO(datos_pdf), rapido=rapido)
+    return texto, time.perf_counter() - inicio
+
+
+def validar(corpus):
+    """Compara los dos caminos sobre `corpus` ((nombre, bytes)) y devuelve el resumen."""
+    resumen = {"pdfs": 0, "segundos_completa": 0.0, "segundos_rapida": 0.0, "diferencias": []}
+    for nombre, datos_pdf in corpus:
+        texto_completo, segundos_completa = _extraer(datos_pdf, rapido=False)
+        texto_rapido, segundos_rapida = _extraer(datos_pdf, rapido=True)
+        resumen["pdfs"] += 1
+        resumen["segundos_completa"] += segundos_completa
+        resumen["segundos_rapida"] += segundos_rapida
+        if (texto_completo is None) != (texto_rapido is None):
+            resumen["diferencias"].append({"pdf": nombre, "motivo": "solo un camino pudo leer el PDF"})
+            continue
+        esperado = parse_notas_desde_texto(texto_completo)
+        obtenido = parse_notas_desde_texto(texto_rapido)
+        if esperado != obtenido:
+            resumen["diferencias"].append({
+                "pdf": nombre,
+                "motivo": "parseo distinto",
+                "semestres": [len(esperado["historial_academico"]), len(obtenido["historial_academico"])],
+                "cabecera_igual": esperado["informacion_estudiante"] == obtenido["informacion_estudiante"],
+            })
+    resumen["segundos_completa"] = round(resumen["segundos_completa"], 3)
+    resumen["segundos_rapida"] = round(resumen["segundos_rapida"], 3)
+    resumen["aceleracion"] = (round(resumen["segundos_completa"] / resumen["segundos_rapida"], 2)
+                              if resumen["segundos_rapida"] else None)
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara la extracción rápida de PDFs con la completa.")
+    parser.add_argument("origenes", nargs="*", help="Directorios o archivos .tar/.tar.gz con PDFs de referencia")
+    parser.add_argument("--sinteticos", type=int, default=0, help="Cantidad de PDFs sintéticos a agregar al corpus")
+    parser.add_argument("--lineas-por-pagina", type=int, default=60, help="Renglones por página de los PDFs sintéticos")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    if not args.origenes and not args.sinteticos:
+        parser.error("Indica al menos un directorio de PDFs o --sinteticos N")
+
+    resumen = validar(_corpus(args.origenes, args.sinteticos, args.lineas_por_pagina, args.semilla))
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    return 1 if resumen["diferencias"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
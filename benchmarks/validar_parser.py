@@ -0,0 +1,242 @@
+"""
+Validación diferencial del parser de reportes de notas.
+
+Compara parse_notas_desde_texto (y parse_notas_desde_lineas con el texto partido
+en fragmentos al azar) con parse_referencia, la implementación anterior a la
+expresión única de funtions._LINEA_PATTERN, sobre textos aleatorios que mezclan
+líneas válidas, casi válidas y ruido. Cualquier diferencia se informa con la
+semilla del caso y termina con código 1.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.validar_parser
+    python -m benchmarks.validar_parser --casos 60000 --semilla 7
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import re
+import sys
+
+from funtions import parse_notas_desde_lineas, parse_notas_desde_texto
+
+
+def parse_referencia(texto_ocr):
+    """parse_notas_desde_texto tal como era antes de iterar_notas (no modificar)."""
+    if not texto_ocr:
+        return {
+            "informacion_estudiante": {},
+            "historial_academico": []
+        }
+
+    lines = texto_ocr.strip().split('\n')
+
+    student_info = {
+        "nombre": None,
+        "codigo_estudiante": None,
+        "promedio_general": None,
+        "creditos_aprobados_pensum": None
+    }
+    academic_history = []
+    current_semester_data = None
+
+    course_pattern = re.compile(
+        r"^(?P<code>\d{6,7})\s+(?P<materia>.+?)\s+(?P<tipo_nota>Definitiva|Vacacional)\s+(?P<definitiva>[\d\.]+)\s*(?P<habilitacion>-|[\d\.]*)?\s*$"
+    )
+    semester_pattern = re.compile(r"^(Primer|Segundo|Tercer|Cuarto|Quinto|Sexto|Septimo|Octavo|Noveno|Decimo|Undecimo|Duodecimo)\s+per[ií]odo\s+de\s+(\d{4})$", re.IGNORECASE)
+    matricula_pattern = re.compile(r"^Matricula\s+honor\b\s*(.*)$", re.IGNORECASE)
+    beca_pattern = re.compile(r"^Beca\b\s*(.*)$", re.IGNORECASE)
+
+    potential_student_info_block = "\n".join(lines[:20])
+
+    match_codigo = re.search(r"Código:\s*(\d+)", potential_student_info_block, re.IGNORECASE)
+    if match_codigo:
+        student_info["codigo_estudiante"] = match_codigo.group(1)
+    else:
+        for i, line_text in enumerate(lines[:20]):
+            if "Código:" in line_text:
+                val_on_line = line_text.split("Código:")[1].strip()
+                if val_on_line and val_on_line.isdigit():
+                    student_info["codigo_estudiante"] = val_on_line
+                    break
+                elif i + 1 < len(lines):
+                    possible_code = lines[i+1].strip()
+                    if possible_code.isdigit():
+                        student_info["codigo_estudiante"] = possible_code
+                        break
+
+    match_nombre = re.search(r"Nombre:\s*(.+?)(?:\s*Promedio:|$)", potential_student_info_block, re.IGNORECASE | re.DOTALL)
+    if match_nombre:
+        student_info["nombre"] = match_nombre.group(1).strip()
+    else:
+        for i, line_text in enumerate(lines[:20]):
+            if "Nombre:" in line_text:
+                val_on_line = line_text.split("Nombre:")[1].strip()
+                if val_on_line and not val_on_line.isdigit():
+                    student_info["nombre"] = val_on_line.split("Promedio:")[0].strip()
+                    break
+                elif i + 1 < len(lines):
+                    possible_name = lines[i+1].strip()
+                    if possible_name and not possible_name.isdigit():
+                        student_info["nombre"] = possible_name.split("Promedio:")[0].strip()
+                        break
+
+    match_prom_cred = re.search(r"Promedio:\s*([\d\.]+)\s*Créditos\s+aprobados\s+Pensum:\s*(\d+)", potential_student_info_block, re.IGNORECASE | re.DOTALL)
+    if match_prom_cred:
+        try:
+            student_info["promedio_general"] = float(match_prom_cred.group(1))
+        except ValueError:
+            print(f"Advertencia (Flask): No se pudo convertir el promedio '{match_prom_cred.group(1)}' a número.")
+        try:
+            student_info["creditos_aprobados_pensum"] = int(match_prom_cred.group(2))
+        except ValueError:
+            print(f"Advertencia (Flask): No se pudo convertir créditos pensum '{match_prom_cred.group(2)}' a número.")
+    else:
+        match_promedio = re.search(r"Promedio:\s*([\d\.]+)", potential_student_info_block, re.IGNORECASE)
+        if match_promedio:
+            try: student_info["promedio_general"] = float(match_promedio.group(1))
+            except ValueError: print(f"Advertencia (Flask): No se pudo convertir el promedio '{match_promedio.group(1)}' a número.")
+
+        match_creditos = re.search(r"Créditos\s+aprobados\s+Pensum:\s*(\d+)", potential_student_info_block, re.IGNORECASE)
+        if match_creditos:
+            try: student_info["creditos_aprobados_pensum"] = int(match_creditos.group(1))
+            except ValueError: print(f"Advertencia (Flask): No se pudo convertir créditos pensum '{match_creditos.group(1)}' a número.")
+
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+
+        if line.startswith("UF") or line.startswith("PS") or \
+           "Universidad Francisco de Paula Santander" in line or \
+           "División de Sistemas" in line or \
+           "Reporte de Notas Semestrales" in line or \
+           line.startswith("Generado:") or \
+           line.startswith("pag ") or \
+           line.lower().startswith("código materia tipo nota definitiva habilitación"):
+            continue
+
+        semester_match = semester_pattern.match(line)
+        if semester_match:
+            if current_semester_data: academic_history.append(current_semester_data)
+            period_desc = semester_match.group(1).capitalize()
+            year = semester_match.group(2)
+            current_semester_data = {"periodo": f"{period_desc} período de {year}", "cursos": []}
+            continue
+
+        if current_semester_data:
+            course_match = course_pattern.match(line)
+            if course_match:
+                data = course_match.groupdict()
+                habilitacion_val = None
+                if data["habilitacion"] and data["habilitacion"] != "-":
+                    try: habilitacion_val = float(data["habilitacion"])
+                    except ValueError: habilitacion_val = data["habilitacion"]
+                materia_nombre = data["materia"].strip()
+                if "matricula de honor" in materia_nombre.lower() or "beca de trabajo" in materia_nombre.lower():
+                    continue
+                current_semester_data["cursos"].append({
+                    "codigo": data["code"], "materia": materia_nombre,
+                    "tipo_nota": data["tipo_nota"],
+                    "definitiva": float(data["definitiva"]) if data["definitiva"] else None,
+                    "habilitacion": habilitacion_val
+                })
+                continue
+
+            matricula_info_match = matricula_pattern.match(line)
+            if matricula_info_match:
+                matricula_descripcion = matricula_info_match.group(1).strip()
+                if matricula_descripcion: current_semester_data["matricula_honor"] = matricula_descripcion
+                continue
+
+            beca_info_match = beca_pattern.match(line)
+            if beca_info_match:
+                beca_descripcion = beca_info_match.group(1).strip()
+                if beca_descripcion: current_semester_data["beca"] = beca_descripcion
+                continue
+
+    if current_semester_data: academic_history.append(current_semester_data)
+
+    return {"informacion_estudiante": student_info, "historial_academico": academic_history}
+
+
+# --- Generación de textos aleatorios ---
+_ORDINALES = ("Primer", "Segundo", "Tercer", "Cuarto", "Quinto", "Sexto", "Septimo",
+              "Octavo", "Noveno", "Decimo", "Undecimo", "Duodecimo", "Trigesimo")
+_MATERIAS = ("CALCULO DIFERENCIAL", "MATRICULA DE HONOR ESPECIAL", "Beca de trabajo", "FISICA I",
+             "PROGRAMACION 2 Definitiva", "ETICA", "X", "BASES DE DATOS  ", "ESTRUCTURAS DE DATOS")
+_RUIDO = ("UFPS", "PS 2024", "Universidad Francisco de Paula Santander", "División de Sistemas - Reporte",
+          "Reporte de Notas Semestrales", "Generado: 2024-06-30", "pag 1 de 3", "pag2",
+          "Código Materia Tipo Nota Definitiva Habilitación", "CÓDIGO MATERIA TIPO NOTA DEFINITIVA HABILITACIÓN x",
+          "Observaciones", "Promedio: 4.1", "Créditos aprobados Pensum: 80", "Matricula honor", "Beca",
+          "Becario", "Matricula honorifica 50%", "Nombre:", "Código:", "12345", "", "   ", "\t")
+
+
+def _numero(rng):
+    return rng.choice(("3.5", "4", "0.0", "5.0", "3.", ".5", "3.4.1", "", "10.25"))
+
+
+def _linea(rng):
+    tipo = rng.random()
+    if tipo < 0.15:
+        periodo = rng.choice(("período", "periodo", "PERÍODO", "perido"))
+        sufijo = rng.choice(("", "", " ", " x"))
+        return f"{rng.choice(_ORDINALES)}{rng.choice((' ', '  ', chr(9)))}{periodo} de {rng.randint(1999, 2030)}{sufijo}"
+    if tipo < 0.6:
+        codigo = str(rng.randint(10000, 99999999))
+        nota_tipo = rng.choice(("Definitiva", "Vacacional", "definitiva", "Habilitacion"))
+        habilitacion = rng.choice(("-", "", _numero(rng), "- -"))
+        return f"{codigo} {rng.choice(_MATERIAS)} {nota_tipo} {_numero(rng)} {habilitacion}{rng.choice(('', ' ', '  '))}"
+    if tipo < 0.7:
+        return rng.choice(("Matricula honor ", "MATRICULA  HONOR", "Beca ", "BECA")) + rng.choice(("", "50%", " trabajo  ", "X"))
+    if tipo < 0.75:
+        return rng.choice(("Código: ", "Nombre: ", "Promedio: ")) + rng.choice(("1151234", "ANA PEREZ", "4.25 Créditos aprobados Pensum: 120", "", "3.4.5"))
+    return rng.choice(_RUIDO)
+
+
+def texto_aleatorio(rng):
+    lineas = [_linea(rng) for _ in range(rng.randint(0, 80))]
+    return rng.choice(("", "\n", "  ")) + "\n".join(lineas) + rng.choice(("", "\n", "\n\n"))
+
+
+def _fragmentos(rng, texto):
+    cortes = sorted(rng.sample(range(len(texto) + 1), min(len(texto) + 1, rng.randint(0, 6))))
+    return [texto[i:j] for i, j in zip([0] + cortes, cortes + [len(texto)])]
+
+
+def _resultado(parser, entrada):
+    """Salida del parser, o el tipo de excepción (p. ej. float('3.4.1') falla en ambos)."""
+    try:
+        return parser(entrada)
+    except Exception as e:
+        return type(e).__name__
+
+
+def validar(casos, semilla=0):
+    """Compara los parsers en `casos` textos aleatorios; devuelve el resumen con las diferencias."""
+    diferencias = []
+    with contextlib.redirect_stdout(io.StringIO()):  # advertencias de conversión de ambos parsers
+        for caso in range(casos):
+            rng = random.Random(f"{semilla}-{caso}")
+            texto = texto_aleatorio(rng)
+            esperado = _resultado(parse_referencia, texto)
+            if _resultado(parse_notas_desde_texto, texto) != esperado:
+                diferencias.append({"caso": caso, "funcion": "parse_notas_desde_texto", "texto": texto})
+            elif texto and _resultado(parse_notas_desde_lineas, _fragmentos(rng, texto)) != esperado:
+                diferencias.append({"caso": caso, "funcion": "parse_notas_desde_lineas", "texto": texto})
+    return {"casos": casos, "semilla": semilla, "diferencias": diferencias}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara el parser de reportes de notas con la implementación de referencia.")
+    parser.add_argument("--casos", type=int, default=20000, help="Textos aleatorios a comparar")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    resumen = validar(args.casos, args.semilla)
+    print(json.dumps(dict(resumen, diferencias=resumen["diferencias"][:5]), ensure_ascii=False, indent=2))
+    return 1 if resumen["diferencias"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
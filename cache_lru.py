@@ -0,0 +1,314 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Caché LRU con TTL ---
+# Backend en memoria (por proceso) o SQLite en disco local, que permite que
+# varios workers de gunicorn compartan las entradas calientes. Cada entrada
+# puede pertenecer a un grupo (p. ej. el código del estudiante) para poder
+# invalidar todas sus entradas de una vez.
+#
+# Cada entrada guarda además la versión de su grupo al momento de calcularse
+# (ver CacheLRU.version): invalidar_grupo() y limpiar() incrementan los contadores
+# de Generaciones, de modo que un valor calculado antes de una invalidación no
+# se guarda y, si se guardó, ya no se devuelve.
+
+_AUSENTE = object()
+
+
+def _conexion_local(local, ruta):
+    # sqlite3 no permite compartir conexiones entre hilos: una por hilo
+    conexion = getattr(local, "conexion", None)
+    if conexion is None:
+        conexion = sqlite3.connect(ruta, timeout=5)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        local.conexion = conexion
+    return conexion
+
+
+class _BackendMemoria:
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()  # clave -> (valor, expira, grupo)
+        self._grupos = {}  # grupo -> set(claves)
+        self._lock = threading.Lock()
+
+    def _quitar(self, clave):
+        _, _, grupo = self._entradas.pop(clave)
+        if grupo is not None:
+            claves = self._grupos.get(grupo)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._grupos[grupo]
+
+    def obtener(self, clave, ahora):
+        """Devuelve (valor, expirada); valor es _AUSENTE si no hay entrada válida."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return _AUSENTE, False
+            valor, expira, _ = entrada
+            if expira is not None and expira <= ahora:
+                self._quitar(clave)
+                return _AUSENTE, True
+            self._entradas.move_to_end(clave)
+            return valor, False
+
+    def guardar(self, clave, valor, expira, grupo):
+        """Guarda la entrada y devuelve cuántas entradas se desalojaron por capacidad."""
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (valor, expira, grupo)
+            if grupo is not None:
+                self._grupos.setdefault(grupo, set()).add(clave)
+            desalojadas = 0
+            while len(self._entradas) > self.capacidad:
+                self._quitar(next(iter(self._entradas)))
+                desalojadas += 1
+            return desalojadas
+
+    def eliminar(self, clave):
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+
+    def invalidar_grupo(self, grupo):
+        with self._lock:
+            claves = list(self._grupos.get(grupo, ()))
+            for clave in claves:
+                self._quitar(clave)
+            return len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._grupos.clear()
+
+    def tamano(self):
+        return len(self._entradas)
+
+
+class _BackendSqlite:
+    def __init__(self, capacidad, ruta, tabla):
+        self.capacidad = capacidad
+        self.ruta = ruta
+        self.tabla = tabla
+        self._local = threading.local()
+        conexion = self._conexion()
+        conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} ("
+            "clave TEXT PRIMARY KEY, grupo TEXT, valor TEXT NOT NULL, expira REAL, acceso REAL NOT NULL)"
+        )
+        conexion.execute(f"CREATE INDEX IF NOT EXISTS {tabla}_grupo ON {tabla} (grupo)")
+        conexion.execute(f"CREATE INDEX IF NOT EXISTS {tabla}_acceso ON {tabla} (acceso)")
+        conexion.commit()
+
+    def _conexion(self):
+        return _conexion_local(self._local, self.ruta)
+
+    def obtener(self, clave, ahora):
+        conexion = self._conexion()
+        fila = conexion.execute(
+            f"SELECT valor, expira FROM {self.tabla} WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return _AUSENTE, False
+        valor, expira = fila
+        with conexion:
+            if expira is not None and expira <= ahora:
+                conexion.execute(f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,))
+                return _AUSENTE, True
+            conexion.execute(f"UPDATE {self.tabla} SET acceso = ? WHERE clave = ?", (ahora, clave))
+        return json.loads(valor), False
+
+    def guardar(self, clave, valor, expira, grupo):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                f"INSERT OR REPLACE INTO {self.tabla} (clave, grupo, valor, expira, acceso) VALUES (?, ?, ?, ?, ?)",
+                (clave, grupo, json.dumps(valor), expira, time.time()),
+            )
+            exceso = conexion.execute(f"SELECT count(*) FROM {self.tabla}").fetchone()[0] - self.capacidad
+            if exceso > 0:
+                conexion.execute(
+                    f"DELETE FROM {self.tabla} WHERE clave IN "
+                    f"(SELECT clave FROM {self.tabla} ORDER BY acceso LIMIT ?)",
+                    (exceso,),
+                )
+                return exceso
+        return 0
+
+    def eliminar(self, clave):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,))
+
+    def invalidar_grupo(self, grupo):
+        conexion = self._conexion()
+        with conexion:
+            return conexion.execute(f"DELETE FROM {self.tabla} WHERE grupo = ?", (grupo,)).rowcount
+
+    def limpiar(self):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(f"DELETE FROM {self.tabla}")
+
+    def tamano(self):
+        return self._conexion().execute(f"SELECT count(*) FROM {self.tabla}").fetchone()[0]
+
+
+class Generaciones:
+    """
+    Contadores de generación por nombre (0 si nunca se incrementaron).
+
+    Con `ruta_compartida` se guardan en un archivo SQLite local: un incremento hecho
+    en un worker de gunicorn (una ingesta, un refresco del pensum) lo ven los demás
+    workers en su siguiente lectura. Sin ella, en memoria del proceso.
+    """
+
+    def __init__(self, ruta_compartida=None, tabla="generaciones"):
+        self.ruta = ruta_compartida
+        self.tabla = tabla
+        self._valores = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if ruta_compartida:
+            conexion = self._conexion()
+            conexion.execute(f"CREATE TABLE IF NOT EXISTS {tabla} (nombre TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+            conexion.commit()
+
+    @property
+    def compartidas(self):
+        return bool(self.ruta)
+
+    def _conexion(self):
+        return _conexion_local(self._local, self.ruta)
+
+    def actual(self, *nombres):
+        if not self.ruta:
+            with self._lock:
+                return [self._valores.get(nombre, 0) for nombre in nombres]
+        marcadores = ", ".join("?" * len(nombres))
+        valores = dict(self._conexion().execute(
+            f"SELECT nombre, valor FROM {self.tabla} WHERE nombre IN ({marcadores})", nombres
+        ).fetchall())
+        return [valores.get(nombre, 0) for nombre in nombres]
+
+    def incrementar(self, nombre):
+        if not self.ruta:
+            with self._lock:
+                valor = self._valores[nombre] = self._valores.get(nombre, 0) + 1
+                return valor
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                f"INSERT INTO {self.tabla} (nombre, valor) VALUES (?, 1) "
+                "ON CONFLICT(nombre) DO UPDATE SET valor = valor + 1", (nombre,))
+            return conexion.execute(f"SELECT valor FROM {self.tabla} WHERE nombre = ?", (nombre,)).fetchone()[0]
+
+
+class CacheLRU:
+    """
+    Caché acotada (LRU) con expiración opcional por TTL y contadores de
+    aciertos, fallos, desalojos, expiraciones, invalidaciones y escrituras
+    descartadas por obsoletas.
+
+    Con `ruta_compartida` las entradas se guardan en un archivo SQLite local
+    (los valores deben ser serializables a JSON); sin ella, en memoria del proceso.
+    `generaciones` guarda las versiones de los grupos (por defecto, en memoria).
+    Los contadores siempre son del proceso actual.
+    """
+
+    def __init__(self, capacidad=1024, ttl=None, ruta_compartida=None, nombre="cache", generaciones=None):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.nombre = nombre
+        if ruta_compartida:
+            self._backend = _BackendSqlite(capacidad, ruta_compartida, nombre)
+        else:
+            self._backend = _BackendMemoria(capacidad)
+        self.generaciones = generaciones or Generaciones()
+        self._contadores = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+                            "stale_writes": 0}
+        self._lock = threading.Lock()
+
+    def version(self, grupo=None):
+        """
+        Versión actual de las entradas de `grupo`: cambia con invalidar_grupo(grupo) y con
+        limpiar(). Se lee antes de calcular un valor y se pasa a guardar().
+        """
+        if grupo is None:
+            return self.generaciones.actual(self.nombre)
+        return self.generaciones.actual(self.nombre, f"{self.nombre}:{grupo}")
+
+    def _contar(self, contador, cantidad=1):
+        with self._lock:
+            self._contadores[contador] += cantidad
+
+    def obtener(self, clave, default=None, contar=True, grupo=None):
+        """
+        Valor guardado para `clave` (del grupo `grupo`, si se guardó con uno); con
+        contar=False no afecta los contadores de aciertos/fallos. Una entrada cuya
+        versión ya no es la actual del grupo cuenta como invalidada.
+        """
+        entrada, expirada = self._backend.obtener(clave, time.time())
+        if expirada:
+            self._contar("expirations")
+        if entrada is not _AUSENTE and not self._vigente(entrada, grupo):
+            self._backend.eliminar(clave)
+            self._contar("invalidations")
+            entrada = _AUSENTE
+        if entrada is _AUSENTE:
+            if contar:
+                self._contar("misses")
+            return default
+        if contar:
+            self._contar("hits")
+        return entrada[1]
+
+    def _vigente(self, entrada, grupo):
+        # Las entradas de un archivo compartido escrito por una versión anterior no tienen versión
+        return isinstance(entrada, list) and len(entrada) == 2 and entrada[0] == self.version(grupo)
+
+    def guardar(self, clave, valor, grupo=None, version=None):
+        """
+        Guarda `valor`. Si se indica `version` (la de version(grupo) antes de calcular el
+        valor) y el grupo se invalidó entretanto, no se guarda y devuelve False.
+        """
+        actual = self.version(grupo)
+        if version is not None and list(version) != actual:
+            self._contar("stale_writes")
+            return False
+        expira = time.time() + self.ttl if self.ttl else None
+        desalojadas = self._backend.guardar(clave, [actual, valor], expira, grupo)
+        if desalojadas:
+            self._contar("evictions", desalojadas)
+        return True
+
+    def invalidar_grupo(self, grupo):
+        """Elimina todas las entradas del grupo; devuelve cuántas se eliminaron."""
+        self.generaciones.incrementar(f"{self.nombre}:{grupo}")
+        eliminadas = self._backend.invalidar_grupo(grupo)
+        if eliminadas:
+            self._contar("invalidations", eliminadas)
+        return eliminadas
+
+    def limpiar(self):
+        self.generaciones.incrementar(self.nombre)
+        self._backend.limpiar()
+
+    def estadisticas(self):
+        with self._lock:
+            estadisticas = dict(self._contadores)
+        consultas = estadisticas["hits"] + estadisticas["misses"]
+        estadisticas["hit_rate"] = estadisticas["hits"] / consultas if consultas else 0.0
+        estadisticas["size"] = self._backend.tamano()
+        estadisticas["capacity"] = self.capacidad
+        estadisticas["ttl"] = self.ttl
+        estadisticas["shared"] = isinstance(self._backend, _BackendSqlite)
+        return estadisticas
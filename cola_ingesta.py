@@ -0,0 +1,241 @@
+import fcntl
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+# --- Cola de ingesta asíncrona de PDFs ---
+# Cada trabajo se guarda en un directorio de spool local: <id>.pdf (el archivo subido)
+# y <id>.json (estado y resultado). Un pool acotado de hilos procesa los trabajos en
+# segundo plano. Mientras un proceso es dueño de un trabajo mantiene un flock sobre
+# <id>.lock; si el proceso muere el bloqueo se libera y otro proceso (o el mismo tras
+# reiniciar) puede recuperarlo.
+
+ESTADO_PENDIENTE = "pending"
+ESTADO_PROCESANDO = "processing"
+ESTADO_COMPLETADO = "done"
+ESTADO_ERROR = "failed"
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ColaLlena(Exception):
+    """La cola alcanzó su capacidad; el cliente debe reintentar más tarde."""
+
+
+class ColaIngesta:
+    """
+    procesador(ruta_pdf, nombre_archivo) hace el trabajo pesado y devuelve un
+    resultado serializable a JSON que queda disponible en el estado del trabajo.
+    """
+
+    def __init__(self, directorio_spool, procesador, max_workers=2, capacidad=100, retencion=86400, max_intentos=3):
+        self.directorio = directorio_spool
+        self.procesador = procesador
+        self.max_workers = max_workers
+        self.capacidad = capacidad
+        self.retencion = retencion
+        self.max_intentos = max_intentos
+        self._cola = queue.Queue()
+        self._bloqueos = {}  # job_id -> descriptor con el flock del trabajo
+        self._en_curso = 0
+        self._lock = threading.Lock()
+        self._hilos = []
+
+    # --- Archivos del spool ---
+    def _ruta(self, job_id, extension):
+        return os.path.join(self.directorio, f"{job_id}.{extension}")
+
+    def _leer_estado(self, job_id):
+        try:
+            with open(self._ruta(job_id, "json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _escribir_estado(self, estado):
+        estado["updatedAt"] = time.time()
+        ruta = self._ruta(estado["jobId"], "json")
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def _tomar_trabajo(self, job_id):
+        """Intenta adquirir el flock del trabajo; devuelve False si otro proceso vivo lo tiene."""
+        fd = os.open(self._ruta(job_id, "lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._bloqueos[job_id] = fd
+        return True
+
+    def _soltar_trabajo(self, job_id):
+        fd = self._bloqueos.pop(job_id, None)
+        if fd is not None:
+            os.close(fd)
+
+    # --- Ciclo de vida ---
+    def iniciar(self):
+        """Crea el spool, recupera los trabajos pendientes y arranca los workers."""
+        os.makedirs(self.directorio, exist_ok=True)
+        self.recuperar()
+        for i in range(self.max_workers):
+            hilo = threading.Thread(target=self._trabajar, name=f"ingesta-pdf-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self, timeout=None):
+        for _ in self._hilos:
+            self._cola.put(None)
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self._hilos = []
+
+    def recuperar(self):
+        """
+        Reencola los trabajos pendientes o interrumpidos que no pertenecen a otro
+        proceso vivo y elimina los terminados con más de `retencion` segundos.
+        Los trabajos recuperados no cuentan contra la capacidad. Devuelve cuántos se reencolaron.
+        """
+        ahora = time.time()
+        recuperables = []
+        for nombre in os.listdir(self.directorio):
+            job_id, extension = os.path.splitext(nombre)
+            if extension != ".json" or not _ID_PATTERN.match(job_id):
+                continue
+            estado = self._leer_estado(job_id)
+            if estado is None:
+                continue
+            if estado["status"] in (ESTADO_COMPLETADO, ESTADO_ERROR):
+                if ahora - estado.get("updatedAt", ahora) > self.retencion:
+                    for ext in ("json", "pdf", "lock"):
+                        try:
+                            os.remove(self._ruta(job_id, ext))
+                        except OSError:
+                            pass
+                continue
+            recuperables.append(estado)
+
+        recuperados = 0
+        for estado in sorted(recuperables, key=lambda e: e.get("createdAt", 0)):
+            job_id = estado["jobId"]
+            if not self._tomar_trabajo(job_id):
+                continue
+            estado = self._leer_estado(job_id)
+            if estado is None or estado["status"] not in (ESTADO_PENDIENTE, ESTADO_PROCESANDO):
+                self._soltar_trabajo(job_id)
+                continue
+            if estado.get("attempts", 0) >= self.max_intentos:
+                # El proceso murió procesándolo varias veces: no se vuelve a intentar
+                estado["status"] = ESTADO_ERROR
+                estado["error"] = f"El trabajo se interrumpió {estado['attempts']} veces."
+                self._escribir_estado(estado)
+                self._soltar_trabajo(job_id)
+                continue
+            estado["status"] = ESTADO_PENDIENTE
+            self._escribir_estado(estado)
+            with self._lock:
+                self._en_curso += 1
+            self._cola.put(job_id)
+            recuperados += 1
+        return recuperados
+
+    # --- API ---
+    def enviar(self, datos_pdf, nombre_archivo):
+        """
+        Guarda el PDF en el spool y lo encola. Devuelve el estado inicial del trabajo.
+        Lanza ColaLlena si ya hay `capacidad` trabajos pendientes o en proceso.
+        """
+        with self._lock:
+            if self._en_curso >= self.capacidad:
+                raise ColaLlena()
+            self._en_curso += 1
+
+        job_id = uuid.uuid4().hex
+        try:
+            self._tomar_trabajo(job_id)
+            with open(self._ruta(job_id, "pdf"), "wb") as f:
+                f.write(datos_pdf)
+            ahora = time.time()
+            estado = {
+                "jobId": job_id,
+                "status": ESTADO_PENDIENTE,
+                "filename": nombre_archivo,
+                "createdAt": ahora,
+                "attempts": 0,
+            }
+            self._escribir_estado(estado)
+        except Exception:
+            self._soltar_trabajo(job_id)
+            with self._lock:
+                self._en_curso -= 1
+            raise
+        self._cola.put(job_id)
+        return estado
+
+    def registrar_completado(self, nombre_archivo, resultado):
+        """
+        Registra un trabajo ya terminado con `resultado`, sin encolarlo (p. ej. un PDF
+        duplicado cuyo resultado ya se conoce). Devuelve su estado.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        ahora = time.time()
+        estado = {
+            "jobId": uuid.uuid4().hex,
+            "status": ESTADO_COMPLETADO,
+            "filename": nombre_archivo,
+            "createdAt": ahora,
+            "attempts": 0,
+            "result": resultado,
+        }
+        self._escribir_estado(estado)
+        return estado
+
+    def estado(self, job_id):
+        """Estado del trabajo leído del spool (visible desde cualquier proceso), o None."""
+        if not _ID_PATTERN.match(job_id):
+            return None
+        return self._leer_estado(job_id)
+
+    def pendientes(self):
+        with self._lock:
+            return self._en_curso
+
+    # --- Worker ---
+    def _trabajar(self):
+        while True:
+            job_id = self._cola.get()
+            if job_id is None:
+                return
+            try:
+                self._procesar(job_id)
+            finally:
+                self._soltar_trabajo(job_id)
+                with self._lock:
+                    self._en_curso -= 1
+
+    def _procesar(self, job_id):
+        estado = self._leer_estado(job_id)
+        if estado is None:
+            return
+        estado["status"] = ESTADO_PROCESANDO
+        estado["attempts"] = estado.get("attempts", 0) + 1
+        self._escribir_estado(estado)
+        ruta_pdf = self._ruta(job_id, "pdf")
+        try:
+            estado["result"] = self.procesador(ruta_pdf, estado.get("filename"))
+            estado["status"] = ESTADO_COMPLETADO
+        except Exception as e:
+            estado["status"] = ESTADO_ERROR
+            estado["error"] = str(e)
+        self._escribir_estado(estado)
+        try:
+            os.remove(ruta_pdf)
+        except OSError:
+            pass
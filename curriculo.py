@@ -0,0 +1,331 @@
+import hashlib
+import json
+import threading
+import time
+
+from metricas import leer_con_tiempos
+
+# --- Modelo curricular en memoria ---
+# El pensum cambia muy pocas veces al año, así que se carga una vez al iniciar
+# y las recomendaciones se evalúan localmente. Neo4j solo tiene que devolver las
+# notas (relaciones TOOK) del estudiante consultado.
+
+CURRICULUM_QUERY = """
+MATCH (c:Course)
+OPTIONAL MATCH (c)-[:REQUIRES]->(req:Course)
+RETURN c.courseId AS courseId,
+       c.name AS name,
+       c.credits AS credits,
+       c.is_elective AS isElective,
+       c.elective_type AS electiveType,
+       c.minCreditsRequired AS minCreditsRequired,
+       [r IN collect(req) | r.courseId] AS prerequisites // conserva los courseId nulos
+"""
+
+# Cero filas => el estudiante no existe; una fila con courseId nulo => existe pero no tiene cursos.
+STUDENT_GRADES_QUERY = """
+MATCH (s:Student {studentId: $targetStudentId})
+OPTIONAL MATCH (s)-[t:TOOK]->(c:Course)
+RETURN c.courseId AS courseId, t.grade AS grade
+"""
+
+STUDENTS_GRADES_QUERY = """
+UNWIND $studentIds AS sid
+MATCH (s:Student {studentId: sid})
+OPTIONAL MATCH (s)-[t:TOOK]->(c:Course)
+RETURN sid AS studentId, c.courseId AS courseId, t.grade AS grade
+"""
+
+# Motivos por los que un estudiante no recibe recomendaciones (campo "reason" de la API)
+MOTIVO_ESTUDIANTE_NO_ENCONTRADO = "student_not_found"
+MOTIVO_SIN_CURSOS_APROBADOS = "no_approved_courses"
+MOTIVO_SIN_ELECTIVAS_ELEGIBLES = "no_eligible_electives"
+
+
+def motivo_sin_recomendaciones(existe, filas_aprobadas, recomendaciones):
+    """Motivo de una respuesta sin recomendaciones, o None si hay alguna."""
+    if not existe:
+        return MOTIVO_ESTUDIANTE_NO_ENCONTRADO
+    if recomendaciones:
+        return None
+    if filas_aprobadas == 0:
+        return MOTIVO_SIN_CURSOS_APROBADOS
+    return MOTIVO_SIN_ELECTIVAS_ELEGIBLES
+
+
+class ModeloCurricular:
+    """
+    Representación indexada del pensum. Cada curso tiene un índice entero; los
+    prerrequisitos de cada electiva se guardan como lista de índices y como
+    bitset (int de Python) para verificar elegibilidad con un AND.
+    """
+
+    def __init__(self, registros_cursos):
+        # Huella del pensum: cambia si cambia cualquier curso o prerrequisito
+        self.version = hashlib.sha256("\n".join(sorted(
+            json.dumps(dict(r, prerequisites=sorted(map(str, r["prerequisites"]))), sort_keys=True, default=str)
+            for r in registros_cursos
+        )).encode("utf-8")).hexdigest()[:16]
+
+        self.ids = []
+        self.nombres = []
+        self.creditos = []
+        self.indice = {}
+
+        registros_cursos = [r for r in registros_cursos if r["courseId"] is not None]
+        for registro in registros_cursos:
+            self.indice[registro["courseId"]] = len(self.ids)
+            self.ids.append(registro["courseId"])
+            self.nombres.append(registro["name"])
+            self.creditos.append(registro["credits"] if registro["credits"] is not None else 0)
+
+        # Bit reservado que ningún estudiante puede tener: marca prerrequisitos
+        # que no se pueden identificar (sin courseId) y que por tanto nunca se cumplen.
+        self._bit_inalcanzable = 1 << len(self.ids)
+
+        # Electivas candidatas: is_elective = true y tipo distinto de 'Sociohumanistic'
+        self.electivas = []
+        self.prerrequisitos = []
+        self.mascaras_prerrequisitos = []
+        self.min_creditos = []
+        for registro in registros_cursos:
+            if registro["isElective"] is not True:
+                continue
+            tipo = registro["electiveType"] if registro["electiveType"] is not None else "Professional"
+            if tipo == "Sociohumanistic":
+                continue
+            prerrequisitos = []
+            mascara = 0
+            for req_id in registro["prerequisites"]:
+                idx = self.indice.get(req_id)
+                if idx is None:
+                    mascara |= self._bit_inalcanzable
+                    continue
+                prerrequisitos.append(idx)
+                mascara |= 1 << idx
+            self.electivas.append(self.indice[registro["courseId"]])
+            self.prerrequisitos.append(prerrequisitos)
+            self.mascaras_prerrequisitos.append(mascara)
+            self.min_creditos.append(registro["minCreditsRequired"])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def estado_estudiante(self, filas_took, passing_grade):
+        """
+        Construye el estado de un estudiante a partir de sus filas (courseId, grade).
+        Replica la semántica de RECOMMENDATION_QUERY: los créditos se suman por
+        cada relación TOOK aprobada y las notas nulas no cuentan como aprobadas.
+        """
+        return EstadoEstudiante(self, filas_took, passing_grade)
+
+    def simular(self, estado, filas_hipoteticas):
+        """
+        Estado hipotético: una copia de `estado` con las filas (courseId, grade) agregadas,
+        como si el estudiante las hubiera cursado. Devuelve (estado_nuevo, cursos_desconocidos).
+        """
+        nuevo = estado.copiar()
+        desconocidos = [course_id for course_id, grade in filas_hipoteticas
+                        if not nuevo.agregar(self, course_id, grade)]
+        return nuevo, desconocidos
+
+    def recomendar(self, estado):
+        """Evalúa elegibilidad y puntaje de todas las electivas para un estado de estudiante."""
+        if estado.filas_aprobadas == 0:
+            return []
+
+        recomendaciones = []
+        no_aprobados = ~estado.aprobados
+        for pos, idx in enumerate(self.electivas):
+            if estado.tomados >> idx & 1:
+                continue
+            if self.mascaras_prerrequisitos[pos] & no_aprobados:
+                continue
+            minimo = self.min_creditos[pos]
+            if minimo is not None and estado.creditos_aprobados < minimo:
+                continue
+
+            suma = 0.0
+            cantidad = 0
+            for req in self.prerrequisitos[pos]:
+                notas = estado.notas.get(req)
+                if notas:
+                    suma += notas[0]
+                    cantidad += notas[1]
+            recomendaciones.append({
+                "id": self.ids[idx],
+                "name": self.nombres[idx],
+                "score": suma / cantidad if cantidad else 0.0
+            })
+
+        recomendaciones.sort(key=lambda r: r["score"], reverse=True)
+        return recomendaciones
+
+    def recomendar_lote(self, filas_por_estudiante, passing_grade):
+        """
+        Recomendaciones de muchos estudiantes a partir de sus filas ya leídas
+        (p. ej. con MotorCurricular.filas_estudiantes). Devuelve dict
+        student_id -> (recomendaciones, motivo), como MotorCurricular.recomendar.
+        """
+        resultados = {}
+        for student_id, filas in filas_por_estudiante.items():
+            if filas is None:
+                resultados[student_id] = (None, MOTIVO_ESTUDIANTE_NO_ENCONTRADO)
+                continue
+            estado = self.estado_estudiante(filas, passing_grade)
+            recomendaciones = self.recomendar(estado)
+            resultados[student_id] = (recomendaciones,
+                                      motivo_sin_recomendaciones(True, estado.filas_aprobadas, recomendaciones))
+        return resultados
+
+
+class EstadoEstudiante:
+    """
+    Cursos tomados/aprobados (bitsets), créditos aprobados y notas por curso de un estudiante.
+    Se puede copiar y extender con filas hipotéticas para simular escenarios sin tocar la base.
+    """
+
+    __slots__ = ("passing_grade", "tomados", "aprobados", "filas_aprobadas", "creditos_aprobados", "notas")
+
+    def __init__(self, modelo, filas_took, passing_grade):
+        self.passing_grade = passing_grade
+        self.tomados = 0
+        self.aprobados = 0
+        self.filas_aprobadas = 0
+        self.creditos_aprobados = 0
+        self.notas = {}  # idx -> [suma de notas, cantidad de notas]
+
+        for course_id, grade in filas_took:
+            self.agregar(modelo, course_id, grade)
+
+    def agregar(self, modelo, course_id, grade):
+        """Suma una fila TOOK (courseId, grade); devuelve False si el curso no está en el pensum."""
+        idx = modelo.indice.get(course_id)
+        if idx is None:
+            return False
+        self.tomados |= 1 << idx
+        if grade is None:
+            return True
+        notas = self.notas.setdefault(idx, [0.0, 0])
+        notas[0] += grade
+        notas[1] += 1
+        if grade >= self.passing_grade:
+            self.aprobados |= 1 << idx
+            self.filas_aprobadas += 1
+            self.creditos_aprobados += modelo.creditos[idx]
+        return True
+
+    def copiar(self):
+        copia = EstadoEstudiante.__new__(EstadoEstudiante)
+        copia.passing_grade = self.passing_grade
+        copia.tomados = self.tomados
+        copia.aprobados = self.aprobados
+        copia.filas_aprobadas = self.filas_aprobadas
+        copia.creditos_aprobados = self.creditos_aprobados
+        copia.notas = {idx: list(notas) for idx, notas in self.notas.items()}
+        return copia
+
+
+# Nombre del contador de Generaciones que anuncia un cambio de pensum a los demás procesos
+GENERACION_PENSUM = "pensum"
+
+
+class MotorCurricular:
+    """
+    Mantiene el ModeloCurricular cargado desde Neo4j y lo refresca bajo demanda
+    o cuando supera `intervalo_refresco` segundos (None o 0 = sin refresco automático).
+    `observar_etapa(etapa, segundos)` recibe los tiempos de las lecturas de notas
+    (ver metricas.leer_con_tiempos) y de la evaluación ('evaluate').
+
+    Con `generaciones` (cache_lru.Generaciones compartidas entre workers), un
+    refrescar(anunciar=True) en un proceso hace que los demás recarguen el pensum
+    en su siguiente acceso a `modelo`.
+    """
+
+    def __init__(self, driver_instance, intervalo_refresco=None, observar_etapa=None, generaciones=None):
+        self.driver = driver_instance
+        self.intervalo_refresco = intervalo_refresco
+        self.observar_etapa = observar_etapa
+        self.generaciones = generaciones
+        self._modelo = None
+        self._generacion = None
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+
+    def _generacion_actual(self):
+        return self.generaciones.actual(GENERACION_PENSUM)[0] if self.generaciones else None
+
+    def refrescar(self, anunciar=False):
+        """
+        Vuelve a cargar el pensum completo desde Neo4j y reemplaza el modelo de forma atómica.
+        Con anunciar=True incrementa antes la generación del pensum para los demás procesos.
+        """
+        if anunciar and self.generaciones:
+            self.generaciones.incrementar(GENERACION_PENSUM)
+        # Se lee antes de cargar: un anuncio durante la carga provoca otra recarga
+        generacion = self._generacion_actual()
+        with self.driver.session() as session:
+            registros = session.execute_read(lambda tx: tx.run(CURRICULUM_QUERY).data())
+        modelo = ModeloCurricular(registros)
+        with self._lock:
+            self._modelo = modelo
+            self._generacion = generacion
+            self._cargado_en = time.time()
+        return modelo
+
+    @property
+    def modelo(self):
+        if self._modelo is None or (
+            self.intervalo_refresco and time.time() - self._cargado_en > self.intervalo_refresco
+        ) or (self.generaciones and self._generacion_actual() != self._generacion):
+            return self.refrescar()
+        return self._modelo
+
+    @property
+    def cargado_en(self):
+        return self._cargado_en
+
+    def filas_estudiante(self, student_id):
+        """Devuelve las filas (courseId, grade) del estudiante, o None si no existe."""
+        registros = leer_con_tiempos(self.driver, STUDENT_GRADES_QUERY, lambda result: result.values(),
+                                     self.observar_etapa, targetStudentId=student_id)
+        if not registros:
+            return None
+        return [(course_id, grade) for course_id, grade in registros if course_id is not None]
+
+    def filas_estudiantes(self, student_ids):
+        """Filas (courseId, grade) de varios estudiantes en una sola consulta; None para los inexistentes."""
+        registros = leer_con_tiempos(self.driver, STUDENTS_GRADES_QUERY, lambda result: result.values(),
+                                     self.observar_etapa, studentIds=list(student_ids))
+        filas = {sid: None for sid in student_ids}
+        for sid, course_id, grade in registros:
+            filas_estudiante = filas[sid]
+            if filas_estudiante is None:
+                filas_estudiante = filas[sid] = []
+            if course_id is not None:
+                filas_estudiante.append((course_id, grade))
+        return filas
+
+    def estado(self, student_id, passing_grade):
+        """(modelo, EstadoEstudiante) del estudiante con una sola lectura, o None si no existe."""
+        filas = self.filas_estudiante(student_id)
+        if filas is None:
+            return None
+        modelo = self.modelo
+        return modelo, modelo.estado_estudiante(filas, passing_grade)
+
+    def recomendar(self, student_id, passing_grade):
+        """
+        Devuelve (recomendaciones, motivo): motivo es None si hay recomendaciones y, si no,
+        uno de los MOTIVO_*; recomendaciones es None si el estudiante no existe.
+        """
+        filas = self.filas_estudiante(student_id)
+        if filas is None:
+            return None, MOTIVO_ESTUDIANTE_NO_ENCONTRADO
+        inicio = time.perf_counter()
+        modelo = self.modelo
+        estado = modelo.estado_estudiante(filas, passing_grade)
+        recomendaciones = modelo.recomendar(estado)
+        if self.observar_etapa:
+            self.observar_etapa("evaluate", time.perf_counter() - inicio)
+        return recomendaciones, motivo_sin_recomendaciones(True, estado.filas_aprobadas, recomendaciones)
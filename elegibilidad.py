@@ -0,0 +1,177 @@
+"""
+Elegibilidad materializada: (:Student)-[:ELIGIBLE_FOR {score, rank}]->(:Course).
+
+La elegibilidad de un estudiante solo cambia cuando cambian sus relaciones TOOK
+(ingesta) o el pensum. Se calcula con el ModeloCurricular en memoria y se guarda
+en el grafo, de modo que una recomendación es una sola lectura indexada por
+studentId, sin recorrer REQUIRES.
+
+Cada Student guarda con qué datos se calculó su elegibilidad:
+- eligibility_passing_grade: nota mínima usada
+- eligibility_curriculum: huella del pensum (ModeloCurricular.version)
+- eligibility_took_version: el took_version del estudiante al calcularla
+- eligibility_approved_courses: relaciones TOOK aprobadas (para el motivo de una lista vacía)
+Si alguno no coincide con el estado actual, la lectura se considera desactualizada
+y quien llama debe calcular la recomendación por el camino normal.
+
+Uso (reconstrucción completa, p. ej. tras cambiar el pensum o una reingesta masiva):
+    python elegibilidad.py --passing-grade 3.0 --lote 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase, basic_auth
+
+from curriculo import MOTIVO_ESTUDIANTE_NO_ENCONTRADO, MotorCurricular, motivo_sin_recomendaciones
+
+# Notas y took_version de varios estudiantes, leídos en la misma transacción
+MATERIALIZATION_GRADES_QUERY = """
+UNWIND $studentIds AS sid
+MATCH (s:Student {studentId: sid})
+OPTIONAL MATCH (s)-[t:TOOK]->(c:Course)
+RETURN sid AS studentId,
+       coalesce(s.took_version, 0) AS tookVersion,
+       collect([c.courseId, t.grade]) AS filas
+"""
+
+# Reemplaza la elegibilidad de cada estudiante. Si el estudiante volvió a ingestar
+# entre la lectura y esta escritura (took_version distinto) no se escribe nada:
+# esa ingesta dispara su propio recálculo.
+MATERIALIZE_QUERY = """
+UNWIND $estudiantes AS est
+MATCH (s:Student {studentId: est.studentId})
+WHERE coalesce(s.took_version, 0) = est.tookVersion
+SET s.eligibility_passing_grade = $passingGrade,
+    s.eligibility_curriculum = $curriculum,
+    s.eligibility_took_version = est.tookVersion,
+    s.eligibility_approved_courses = est.approvedCourses,
+    s.eligibility_updated_at = timestamp()
+WITH s, est
+CALL {
+    WITH s
+    MATCH (s)-[old:ELIGIBLE_FOR]->()
+    DELETE old
+}
+CALL {
+    WITH s, est
+    UNWIND est.electivas AS e
+    MATCH (c:Course {courseId: e.id})
+    CREATE (s)-[:ELIGIBLE_FOR {score: e.score, rank: e.rank}]->(c)
+}
+RETURN count(s) AS materializados
+"""
+
+ELIGIBILITY_QUERY = """
+MATCH (s:Student {studentId: $targetStudentId})
+OPTIONAL MATCH (s)-[e:ELIGIBLE_FOR]->(c:Course)
+WITH s, e, c
+ORDER BY e.rank
+RETURN coalesce(s.took_version, 0) AS tookVersion,
+       s.eligibility_took_version AS eligibilityTookVersion,
+       s.eligibility_passing_grade AS passingGrade,
+       s.eligibility_curriculum AS curriculum,
+       s.eligibility_approved_courses AS approvedCourses,
+       collect(CASE WHEN c IS NULL THEN NULL ELSE {id: c.courseId, name: c.name, score: e.score} END) AS recommendations
+"""
+
+ALL_STUDENTS_QUERY = """
+MATCH (s:Student)
+RETURN s.studentId AS studentId
+ORDER BY studentId
+"""
+
+
+def materializar_estudiantes(driver_instance, modelo, student_ids, passing_grade):
+    """
+    Recalcula y guarda la elegibilidad de los estudiantes indicados con `modelo`.
+    Devuelve cuántos se materializaron (los inexistentes o modificados entretanto se saltan).
+    """
+    with driver_instance.session() as session:
+        registros = session.execute_read(
+            lambda tx: tx.run(MATERIALIZATION_GRADES_QUERY, studentIds=list(student_ids)).data()
+        )
+    estudiantes = []
+    for registro in registros:
+        filas = [(course_id, grade) for course_id, grade in registro["filas"] if course_id is not None]
+        estado = modelo.estado_estudiante(filas, passing_grade)
+        estudiantes.append({
+            "studentId": registro["studentId"],
+            "tookVersion": registro["tookVersion"],
+            "approvedCourses": estado.filas_aprobadas,
+            "electivas": [
+                {"id": r["id"], "score": r["score"], "rank": rank}
+                for rank, r in enumerate(modelo.recomendar(estado))
+            ],
+        })
+    if not estudiantes:
+        return 0
+    with driver_instance.session() as session:
+        return session.execute_write(
+            lambda tx: tx.run(MATERIALIZE_QUERY, estudiantes=estudiantes,
+                              passingGrade=passing_grade, curriculum=modelo.version).single()["materializados"]
+        )
+
+
+def leer_elegibilidad(driver_instance, student_id, passing_grade, modelo, lector=None):
+    """
+    Lee la elegibilidad materializada. Devuelve (recomendaciones, motivo) como
+    MotorCurricular.recomendar; (None, MOTIVO_ESTUDIANTE_NO_ENCONTRADO) si el
+    estudiante no existe, o None si la elegibilidad falta o está desactualizada
+    respecto a `passing_grade`, al pensum de `modelo` o a las notas del estudiante.
+    `lector(consulta, procesar, **parametros)` permite medir la lectura (ver metricas.leer_con_tiempos).
+    """
+    if lector is None:
+        def lector(consulta, procesar, **parametros):
+            with driver_instance.session() as session:
+                return session.execute_read(lambda tx: procesar(tx.run(consulta, **parametros)))
+    registro = lector(ELIGIBILITY_QUERY, lambda result: result.single(), targetStudentId=student_id)
+    if registro is None:
+        return None, MOTIVO_ESTUDIANTE_NO_ENCONTRADO
+    if (registro["passingGrade"] != passing_grade
+            or registro["curriculum"] != modelo.version
+            or registro["eligibilityTookVersion"] != registro["tookVersion"]):
+        return None
+    recomendaciones = registro["recommendations"]
+    return recomendaciones, motivo_sin_recomendaciones(True, registro["approvedCourses"], recomendaciones)
+
+
+def reconstruir(driver_instance, modelo, passing_grade, lote=500, intervalo_progreso=5.0):
+    """Materializa la elegibilidad de todos los estudiantes, de a `lote` por transacción."""
+    with driver_instance.session() as session:
+        student_ids = session.execute_read(lambda tx: tx.run(ALL_STUDENTS_QUERY).value())
+    inicio = ultimo_progreso = time.time()
+    materializados = 0
+    for posicion in range(0, len(student_ids), lote):
+        materializados += materializar_estudiantes(driver_instance, modelo, student_ids[posicion:posicion + lote], passing_grade)
+        if time.time() - ultimo_progreso >= intervalo_progreso:
+            ultimo_progreso = time.time()
+            print(f"[{ultimo_progreso - inicio:.0f}s] {materializados}/{len(student_ids)} estudiantes", file=sys.stderr)
+    return {"estudiantes": len(student_ids), "materializados": materializados,
+            "segundos": round(time.time() - inicio, 2), "curriculum": modelo.version}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstruye la elegibilidad materializada (ELIGIBLE_FOR) de todos los estudiantes.")
+    parser.add_argument("--passing-grade", type=float, default=3.0, help="Nota mínima para considerar un curso aprobado")
+    parser.add_argument("--lote", type=int, default=500, help="Estudiantes por transacción")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    driver_instance = GraphDatabase.driver(os.getenv('NEO4J_URI'),
+                                           auth=basic_auth(os.getenv('NEO4J_USER'), os.getenv('NEO4J_PASSWORD')))
+    try:
+        driver_instance.verify_connectivity()
+        modelo = MotorCurricular(driver_instance).refrescar()
+        resumen = reconstruir(driver_instance, modelo, args.passing_grade, lote=args.lote)
+    finally:
+        driver_instance.close()
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Esquema de Neo4j: restricciones de unicidad e índices que respaldan las consultas.
+
+Todas las consultas calientes buscan por Student {studentId} o Course {courseId}
+(recomendaciones, notas del estudiante, MERGE de la ingesta). Sin restricción ni
+índice esas búsquedas recorren todos los nodos de la etiqueta. Los comandos usan
+IF NOT EXISTS, así que aplicar el esquema varias veces no tiene efecto.
+
+Uso:
+    python esquema.py                  # crea lo que falte y verifica que todo esté ONLINE
+    python esquema.py --solo-verificar # solo informa los índices faltantes o no disponibles
+"""
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase, basic_auth
+
+# (nombre, etiqueta, propiedad, comando). Las restricciones de unicidad crean su
+# propio índice de rango, que es el que usan MATCH y MERGE.
+ESQUEMA = [
+    ("student_student_id", "Student", "studentId",
+     "CREATE CONSTRAINT student_student_id IF NOT EXISTS FOR (s:Student) REQUIRE s.studentId IS UNIQUE"),
+    ("course_course_id", "Course", "courseId",
+     "CREATE CONSTRAINT course_course_id IF NOT EXISTS FOR (c:Course) REQUIRE c.courseId IS UNIQUE"),
+    ("course_is_elective", "Course", "is_elective",
+     "CREATE INDEX course_is_elective IF NOT EXISTS FOR (c:Course) ON (c.is_elective)"),
+]
+
+SHOW_INDEXES_QUERY = """
+SHOW INDEXES YIELD name, state, labelsOrTypes, properties, populationPercent
+RETURN name, state, labelsOrTypes, properties, populationPercent
+"""
+
+
+def verificar_esquema(driver_instance):
+    """
+    Busca, para cada entrada de ESQUEMA, un índice sobre la misma etiqueta y propiedad
+    (con cualquier nombre). Devuelve una lista de dicts con el estado de cada una;
+    `ok` es True solo si el índice existe y está ONLINE.
+    """
+    with driver_instance.session() as session:
+        indices = session.execute_read(lambda tx: tx.run(SHOW_INDEXES_QUERY).data())
+
+    informe = []
+    for nombre, etiqueta, propiedad, _ in ESQUEMA:
+        candidatos = [i for i in indices
+                      if i["labelsOrTypes"] == [etiqueta] and i["properties"] == [propiedad]]
+        # Si hay varios índices sobre la misma propiedad basta con que uno esté disponible
+        indice = next((i for i in candidatos if i["state"] == "ONLINE"), candidatos[0] if candidatos else None)
+        informe.append({
+            "esperado": nombre,
+            "etiqueta": etiqueta,
+            "propiedad": propiedad,
+            "indice": indice["name"] if indice else None,
+            "estado": indice["state"] if indice else "MISSING",
+            "poblacion": indice["populationPercent"] if indice else None,
+            "ok": bool(indice) and indice["state"] == "ONLINE",
+        })
+    return informe
+
+
+def asegurar_esquema(driver_instance, espera=300):
+    """
+    Crea las restricciones e índices que falten, espera hasta `espera` segundos a que
+    terminen de poblarse y verifica el resultado. Un comando que falla (p. ej. porque
+    hay courseId duplicados en el grafo) se informa en `errores` sin detener los demás.
+    Devuelve {"errores": {...}, "indices": [...], "faltantes": [...]}.
+    """
+    errores = {}
+    with driver_instance.session() as session:
+        for nombre, _, _, comando in ESQUEMA:
+            try:
+                session.run(comando).consume()
+            except Exception as e:
+                errores[nombre] = str(e)
+        if espera:
+            try:
+                session.run("CALL db.awaitIndexes($segundos)", segundos=int(espera)).consume()
+            except Exception as e:
+                # No es fatal: la verificación informa los índices que sigan poblándose
+                errores["awaitIndexes"] = str(e)
+
+    indices = verificar_esquema(driver_instance)
+    return {
+        "errores": errores,
+        "indices": indices,
+        "faltantes": [i["esperado"] for i in indices if not i["ok"]],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crea y verifica las restricciones e índices de Neo4j.")
+    parser.add_argument("--solo-verificar", action="store_true", help="No crea nada; solo informa el estado de los índices")
+    parser.add_argument("--espera", type=int, default=300, help="Segundos máximos de espera a que los índices estén ONLINE")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    driver_instance = GraphDatabase.driver(os.getenv('NEO4J_URI'),
+                                           auth=basic_auth(os.getenv('NEO4J_USER'), os.getenv('NEO4J_PASSWORD')))
+    try:
+        driver_instance.verify_connectivity()
+        if args.solo_verificar:
+            indices = verificar_esquema(driver_instance)
+            informe = {"indices": indices, "faltantes": [i["esperado"] for i in indices if not i["ok"]]}
+        else:
+            informe = asegurar_esquema(driver_instance, espera=args.espera)
+    finally:
+        driver_instance.close()
+    print(json.dumps(informe, ensure_ascii=False, indent=2))
+    return 0 if not informe["faltantes"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,58 +1,270 @@
 import pdfplumber
+from pdfminer.layout import LTChar, LTContainer
 import re
+import hashlib
 import json
 import io
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 
+# Huella del código de extracción y parseo (este archivo): cambia con cualquier
+# modificación, de modo que los resultados guardados por contenido de un PDF
+# (caché de transcripciones de app.py) no sobreviven a un cambio del parser.
+with open(__file__, 'rb') as _fuente:
+    VERSION_PARSER = hashlib.sha256(_fuente.read()).hexdigest()[:12]
+
+# Pool de procesos compartido para la extracción en paralelo (se crea al primer uso)
+_pool_extraccion = None
+_pool_extraccion_workers = None
+_pool_extraccion_lock = threading.Lock()
+
+# Los procesos del pool no se crean con fork: el proceso que extrae (un worker gthread
+# de gunicorn) tiene hilos, conexiones y locks que no deben copiarse a los hijos.
+_CONTEXTO_POOL = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+if _CONTEXTO_POOL.get_start_method() == "forkserver":
+    # El servidor de procesos importa pdfplumber una sola vez y cada hijo lo hereda
+    _CONTEXTO_POOL.set_forkserver_preload(["funtions"])
+
+# Por debajo de este número de páginas no compensa repartir el trabajo entre procesos
+MIN_PAGINAS_PARALELO = 3
+
+def _obtener_pool_extraccion(max_workers, roto=None):
+    """Pool compartido con `max_workers` procesos; si `roto` es el pool actual, lo reemplaza."""
+    global _pool_extraccion, _pool_extraccion_workers
+    with _pool_extraccion_lock:
+        if roto is not None and _pool_extraccion is roto:
+            roto.shutdown(wait=False, cancel_futures=True)
+            _pool_extraccion = None
+        if _pool_extraccion is None or _pool_extraccion_workers != max_workers:
+            if _pool_extraccion is not None:
+                _pool_extraccion.shutdown(wait=False)
+            _pool_extraccion = ProcessPoolExecutor(max_workers=max_workers, mp_context=_CONTEXTO_POOL)
+            _pool_extraccion_workers = max_workers
+        return _pool_extraccion
+
+def cerrar_pool_extraccion():
+    """Detiene el pool de extracción de este proceso (al terminar un worker de gunicorn)."""
+    global _pool_extraccion, _pool_extraccion_workers
+    with _pool_extraccion_lock:
+        if _pool_extraccion is not None:
+            _pool_extraccion.shutdown(wait=False, cancel_futures=True)
+            _pool_extraccion = None
+            _pool_extraccion_workers = None
+
+def _extraer_paginas(datos_pdf, inicio, fin, rapido=False):
+    """Extrae el texto de las páginas [inicio, fin) (se ejecuta en un proceso del pool)."""
+    extraer = _texto_rapido if rapido else _texto_completo
+    with pdfplumber.open(io.BytesIO(datos_pdf)) as pdf:
+        return [extraer(pdf.pages[i]) for i in range(inicio, fin)]
+
+def _texto_completo(pagina):
+    return pagina.extract_text()
+
+# --- Extracción rápida ---
+# Tolerancias (en puntos) iguales a las de extract_text() de pdfplumber
+TOLERANCIA_X = 3
+TOLERANCIA_Y = 3
+_LIGADURAS = {"ﬀ": "ff", "ﬃ": "ffi", "ﬄ": "ffl", "ﬁ": "fi", "ﬂ": "fl", "ﬆ": "st", "ﬅ": "st"}
+
+def _caracteres(objetos):
+    for objeto in objetos:
+        if isinstance(objeto, LTChar):
+            yield objeto
+        elif isinstance(objeto, LTContainer):
+            yield from _caracteres(objeto)
+
+def _texto_rapido(pagina):
+    """
+    Texto de la página leído directamente de los caracteres de pdfminer (pagina.layout),
+    sin convertirlos a los diccionarios de pdfplumber ni analizar el diseño: los
+    caracteres se agrupan en renglones por altura y en palabras por distancia
+    horizontal, con las mismas tolerancias que extract_text(). Supone texto
+    horizontal, que es el caso del reporte de notas.
+    """
+    renglones = []
+    renglon = []
+    tope_anterior = None
+    for caracter in sorted(_caracteres(pagina.layout), key=lambda c: -c.y1):
+        if tope_anterior is not None and tope_anterior - caracter.y1 > TOLERANCIA_Y:
+            renglones.append(renglon)
+            renglon = []
+        renglon.append(caracter)
+        tope_anterior = caracter.y1
+    if renglon:
+        renglones.append(renglon)
+
+    lineas = []
+    for renglon in renglones:
+        renglon.sort(key=lambda c: c.x0)
+        palabras = []
+        palabra = []
+        fin_anterior = None
+        for caracter in renglon:
+            texto = caracter.get_text()
+            if texto.isspace():
+                if palabra:
+                    palabras.append("".join(palabra))
+                    palabra = []
+                fin_anterior = None
+                continue
+            if palabra and caracter.x0 - fin_anterior > TOLERANCIA_X:
+                palabras.append("".join(palabra))
+                palabra = []
+            palabra.append(_LIGADURAS.get(texto, texto))
+            fin_anterior = caracter.x1
+        if palabra:
+            palabras.append("".join(palabra))
+        lineas.append(" ".join(palabras))
+    return "\n".join(lineas)
+
+def _tiene_notas(texto):
+    """True si alguna línea de la página es un semestre, un curso, una matrícula de honor o una beca."""
+    for linea in texto.split('\n'):
+        match = _LINEA_PATTERN.match(linea.strip())
+        if match and match.lastgroup != "ignorar":
+            return True
+    return False
+
+def _paginas_con_notas(textos_paginas):
+    """
+    Filtra el texto de las páginas (un iterable que se consume a medida que se necesita).
+    Se conservan la primera página y las necesarias para completar la cabecera del
+    estudiante; después, solo las páginas con semestres o cursos: las anteriores al
+    primer bloque de notas (portadas) se saltan y la primera página sin notas después
+    de ellas (pie, firmas) termina la extracción sin leer las siguientes.
+    """
+    lineas_cabecera = 0
+    hubo_notas = False
+    for numero, texto in enumerate(textos_paginas):
+        texto = texto or ""
+        con_notas = _tiene_notas(texto)
+        if numero == 0 or lineas_cabecera <= LINEAS_CABECERA or con_notas:
+            yield texto
+            lineas_cabecera += sum(1 for linea in texto.split('\n') if linea.strip())
+        elif hubo_notas:
+            return
+        hubo_notas = hubo_notas or con_notas
+
+def _unir_paginas(textos_paginas):
+    return "".join(texto + "\n" for texto in textos_paginas if texto)
+
 # --- Tus funciones de extracción y parseo (exactamente como las tenías) ---
-def extraer_texto_de_pdf(archivo_pdf_stream): # Modificado para aceptar un stream
-    texto_completo = ""
+def extraer_texto_de_pdf(archivo_pdf_stream, paralelo=False, max_workers=None, max_paginas=None, rapido=False): # Modificado para aceptar un stream
+    """
+    Extrae el texto de todas las páginas del PDF, en orden, separadas por saltos de línea.
+
+    Con `paralelo=True` el archivo se lee una sola vez en memoria y las páginas se
+    reparten en bloques contiguos entre `max_workers` procesos (por defecto, uno por
+    núcleo). `max_paginas` limita cuántas páginas se procesan.
+
+    Con `rapido=True` cada página se lee con _texto_rapido y solo se devuelven las
+    páginas que aportan al parseo (ver _paginas_con_notas). El resultado de
+    parse_notas_desde_texto es el mismo; el texto en sí puede no serlo.
+    """
     try:
+        if paralelo:
+            return _extraer_texto_en_paralelo(archivo_pdf_stream, max_workers, max_paginas, rapido)
         # pdfplumber.open() puede trabajar directamente con un stream de archivo
         with pdfplumber.open(archivo_pdf_stream) as pdf:
-            for pagina in pdf.pages:
-                texto_pagina = pagina.extract_text()
-                if texto_pagina:
-                    texto_completo += texto_pagina + "\n"
+            paginas = pdf.pages if max_paginas is None else pdf.pages[:max_paginas]
+            if rapido:
+                return _unir_paginas(_paginas_con_notas(_texto_rapido(pagina) for pagina in paginas))
+            return _unir_paginas(pagina.extract_text() for pagina in paginas)
     except Exception as e:
         # En una API, es mejor loggear el error o devolver un mensaje de error más específico
         print(f"Error al leer el PDF: {e}")
         return None
-    return texto_completo
 
-def parse_notas_desde_texto(texto_ocr):
-    if not texto_ocr:
-        # print("No se pudo extraer texto del PDF o el texto está vacío.") # Se maneja en el endpoint
-        return {
-            "informacion_estudiante": {},
-            "historial_academico": []
-        }
+def _extraer_texto_en_paralelo(archivo_pdf_stream, max_workers, max_paginas, rapido=False):
+    datos_pdf = archivo_pdf_stream if isinstance(archivo_pdf_stream, bytes) else archivo_pdf_stream.read()
+    filtrar = _paginas_con_notas if rapido else iter
+    with pdfplumber.open(io.BytesIO(datos_pdf)) as pdf:
+        total_paginas = len(pdf.pages)
+        if max_paginas is not None:
+            total_paginas = min(total_paginas, max_paginas)
+        if total_paginas < MIN_PAGINAS_PARALELO:
+            extraer = _texto_rapido if rapido else _texto_completo
+            return _unir_paginas(filtrar(extraer(pdf.pages[i]) for i in range(total_paginas)))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    bloques = min(max_workers, total_paginas)
+    tamano = -(-total_paginas // bloques)
+    roto = None
+    for intento in range(2):
+        pool = _obtener_pool_extraccion(max_workers, roto)
+        try:
+            futuros = [
+                pool.submit(_extraer_paginas, datos_pdf, inicio, min(inicio + tamano, total_paginas), rapido)
+                for inicio in range(0, total_paginas, tamano)
+            ]
+            textos_paginas = []
+            for futuro in futuros:
+                textos_paginas.extend(futuro.result())
+            break
+        except BrokenProcessPool:
+            # Un proceso del pool murió (p. ej. por el OOM killer): se recrea el pool y se reintenta una vez
+            if intento:
+                raise
+            roto = pool
+    # En paralelo todas las páginas se leen; el filtro deja el mismo texto que en serie
+    return _unir_paginas(filtrar(textos_paginas))
+
+# Número de líneas iniciales donde se busca la información del estudiante
+LINEAS_CABECERA = 20
+
+# Una sola expresión clasifica cada línea; las alternativas se prueban en el mismo
+# orden que la cadena original de comprobaciones (líneas ignoradas, semestre, curso,
+# matrícula de honor, beca) y `lastgroup` indica cuál coincidió.
+_LINEA_PATTERN = re.compile(r"""
+    ^(?:
+        (?P<ignorar>
+            UF | PS | Generado: | pag\ 
+          | (?i:código\ materia\ tipo\ nota\ definitiva\ habilitación)
+          | .*?(?:Universidad\ Francisco\ de\ Paula\ Santander | División\ de\ Sistemas | Reporte\ de\ Notas\ Semestrales)
+        )
+      | (?P<semestre>
+            (?i:(?P<sem_tipo>Primer|Segundo|Tercer|Cuarto|Quinto|Sexto|Septimo|Octavo|Noveno|Decimo|Undecimo|Duodecimo)
+                \s+per[ií]odo\s+de\s+(?P<sem_anio>\d{4})$)
+        )
+      | (?P<curso>
+            (?P<code>\d{6,7})\s+(?P<materia>.+?)\s+(?P<tipo_nota>Definitiva|Vacacional)\s+
+            (?P<definitiva>[\d\.]+)\s*(?P<habilitacion>-|[\d\.]*)?\s*$
+        )
+      | (?P<matricula>(?i:Matricula\s+honor\b)\s*(?P<matricula_desc>.*)$)
+      | (?P<beca>(?i:Beca\b)\s*(?P<beca_desc>.*)$)
+    )
+""", re.VERBOSE)
 
-    lines = texto_ocr.strip().split('\n')
+def _lineas(fragmentos):
+    """Convierte un iterable de fragmentos de texto (p. ej. una página por elemento) en líneas."""
+    resto = ""
+    for fragmento in fragmentos:
+        partes = (resto + fragmento).split('\n')
+        resto = partes.pop()
+        yield from partes
+    yield resto
 
+def _extraer_info_estudiante(lines):
+    """Información del estudiante a partir de las primeras LINEAS_CABECERA + 1 líneas."""
     student_info = {
         "nombre": None,
         "codigo_estudiante": None,
         "promedio_general": None,
         "creditos_aprobados_pensum": None
     }
-    academic_history = []
-    current_semester_data = None
-
-    course_pattern = re.compile(
-        r"^(?P<code>\d{6,7})\s+(?P<materia>.+?)\s+(?P<tipo_nota>Definitiva|Vacacional)\s+(?P<definitiva>[\d\.]+)\s*(?P<habilitacion>-|[\d\.]*)?\s*$"
-    )
-    semester_pattern = re.compile(r"^(Primer|Segundo|Tercer|Cuarto|Quinto|Sexto|Septimo|Octavo|Noveno|Decimo|Undecimo|Duodecimo)\s+per[ií]odo\s+de\s+(\d{4})$", re.IGNORECASE)
-    matricula_pattern = re.compile(r"^Matricula\s+honor\b\s*(.*)$", re.IGNORECASE)
-    beca_pattern = re.compile(r"^Beca\b\s*(.*)$", re.IGNORECASE)
 
-    potential_student_info_block = "\n".join(lines[:20])
+    potential_student_info_block = "\n".join(lines[:LINEAS_CABECERA])
 
     match_codigo = re.search(r"Código:\s*(\d+)", potential_student_info_block, re.IGNORECASE)
     if match_codigo:
         student_info["codigo_estudiante"] = match_codigo.group(1)
     else:
-        for i, line_text in enumerate(lines[:20]):
+        for i, line_text in enumerate(lines[:LINEAS_CABECERA]):
             if "Código:" in line_text:
                 val_on_line = line_text.split("Código:")[1].strip()
                 if val_on_line and val_on_line.isdigit():
@@ -68,7 +280,7 @@ def parse_notas_desde_texto(texto_ocr):
     if match_nombre:
         student_info["nombre"] = match_nombre.group(1).strip()
     else:
-        for i, line_text in enumerate(lines[:20]):
+        for i, line_text in enumerate(lines[:LINEAS_CABECERA]):
             if "Nombre:" in line_text:
                 val_on_line = line_text.split("Nombre:")[1].strip()
                 if val_on_line and not val_on_line.isdigit(): # Asegurarse que no es un número
@@ -101,60 +313,114 @@ def parse_notas_desde_texto(texto_ocr):
             try: student_info["creditos_aprobados_pensum"] = int(match_creditos.group(1))
             except ValueError: print(f"Advertencia (Flask): No se pudo convertir créditos pensum '{match_creditos.group(1)}' a número.")
 
-    for line_idx, line in enumerate(lines):
-        line = line.strip()
+    return student_info
+
+def iterar_notas(fragmentos):
+    """
+    Parser incremental del reporte de notas. Recibe un iterable de líneas o de
+    fragmentos de texto (p. ej. la salida página a página de extraer_texto_de_pdf)
+    y produce eventos a medida que avanza:
+
+    - ("estudiante", info): una sola vez, en cuanto se conoce la cabecera.
+    - ("curso", curso): por cada curso reconocido.
+    - ("semestre", semestre): al cerrar cada semestre, con todos sus cursos.
+
+    Los diccionarios tienen la misma estructura que parse_notas_desde_texto.
+    """
+    cabecera = []
+    pendientes = []  # eventos producidos antes de resolver la cabecera
+    info_resuelta = False
+    current_semester_data = None
+
+    for linea_cruda in _lineas(fragmentos):
+        if not info_resuelta:
+            # Igual que texto.strip(): se descartan los espacios y líneas en blanco iniciales
+            if not cabecera:
+                linea_cruda = linea_cruda.lstrip()
+                if not linea_cruda:
+                    continue
+            cabecera.append(linea_cruda)
+            # La cabecera usa hasta la línea LINEAS_CABECERA + 1 (valor en la línea siguiente).
+            # Se espera una línea no vacía más allá para no contar líneas en blanco finales.
+            if len(cabecera) > LINEAS_CABECERA and linea_cruda.strip():
+                info_resuelta = True
+                yield "estudiante", _extraer_info_estudiante(cabecera[:LINEAS_CABECERA + 1])
+                yield from pendientes
+                pendientes = None
+
+        eventos = pendientes if not info_resuelta else None
+        line = linea_cruda.strip()
         if not line: continue
 
-        if line.startswith("UF") or line.startswith("PS") or \
-           "Universidad Francisco de Paula Santander" in line or \
-           "División de Sistemas" in line or \
-           "Reporte de Notas Semestrales" in line or \
-           line.startswith("Generado:") or \
-           line.startswith("pag ") or \
-           line.lower().startswith("código materia tipo nota definitiva habilitación"):
+        match = _LINEA_PATTERN.match(line)
+        tipo = match.lastgroup if match else None
+        if tipo is None or tipo == "ignorar":
             continue
 
-        semester_match = semester_pattern.match(line)
-        if semester_match:
-            if current_semester_data: academic_history.append(current_semester_data)
-            period_desc = semester_match.group(1).capitalize()
-            year = semester_match.group(2)
+        if tipo == "semestre":
+            if current_semester_data:
+                if eventos is None: yield "semestre", current_semester_data
+                else: eventos.append(("semestre", current_semester_data))
+            period_desc = match.group("sem_tipo").capitalize()
+            year = match.group("sem_anio")
             current_semester_data = {"periodo": f"{period_desc} período de {year}", "cursos": []}
             continue
 
-        if current_semester_data:
-            course_match = course_pattern.match(line)
-            if course_match:
-                data = course_match.groupdict()
-                habilitacion_val = None
-                if data["habilitacion"] and data["habilitacion"] != "-":
-                    try: habilitacion_val = float(data["habilitacion"])
-                    except ValueError: habilitacion_val = data["habilitacion"]
-                materia_nombre = data["materia"].strip()
-                if "matricula de honor" in materia_nombre.lower() or "beca de trabajo" in materia_nombre.lower():
-                    continue
-                current_semester_data["cursos"].append({
-                    "codigo": data["code"], "materia": materia_nombre,
-                    "tipo_nota": data["tipo_nota"],
-                    "definitiva": float(data["definitiva"]) if data["definitiva"] else None,
-                    "habilitacion": habilitacion_val
-                })
-                continue
-            
-            matricula_info_match = matricula_pattern.match(line)
-            if matricula_info_match:
-                matricula_descripcion = matricula_info_match.group(1).strip()
-                if matricula_descripcion: current_semester_data["matricula_honor"] = matricula_descripcion
-                continue
+        if not current_semester_data:
+            continue
 
-            beca_info_match = beca_pattern.match(line)
-            if beca_info_match:
-                beca_descripcion = beca_info_match.group(1).strip()
-                if beca_descripcion : current_semester_data["beca"] = beca_descripcion
+        if tipo == "curso":
+            habilitacion = match.group("habilitacion")
+            habilitacion_val = None
+            if habilitacion and habilitacion != "-":
+                try: habilitacion_val = float(habilitacion)
+                except ValueError: habilitacion_val = habilitacion
+            materia_nombre = match.group("materia").strip()
+            materia_minusculas = materia_nombre.lower()
+            if "matricula de honor" in materia_minusculas or "beca de trabajo" in materia_minusculas:
                 continue
-                
-    if current_semester_data: academic_history.append(current_semester_data)
+            definitiva = match.group("definitiva")
+            curso = {
+                "codigo": match.group("code"), "materia": materia_nombre,
+                "tipo_nota": match.group("tipo_nota"),
+                "definitiva": float(definitiva) if definitiva else None,
+                "habilitacion": habilitacion_val
+            }
+            current_semester_data["cursos"].append(curso)
+            if eventos is None: yield "curso", curso
+            else: eventos.append(("curso", curso))
+        elif tipo == "matricula":
+            matricula_descripcion = match.group("matricula_desc").strip()
+            if matricula_descripcion: current_semester_data["matricula_honor"] = matricula_descripcion
+        elif tipo == "beca":
+            beca_descripcion = match.group("beca_desc").strip()
+            if beca_descripcion: current_semester_data["beca"] = beca_descripcion
 
-    # No es necesario imprimir advertencias aquí, se pueden manejar en la respuesta del endpoint si es necesario
+    if not info_resuelta:
+        lines = "\n".join(cabecera).strip().split('\n')
+        yield "estudiante", _extraer_info_estudiante(lines[:LINEAS_CABECERA + 1])
+        yield from pendientes
+    if current_semester_data: yield "semestre", current_semester_data
+
+def parse_notas_desde_lineas(fragmentos):
+    """Versión de parse_notas_desde_texto que consume líneas o fragmentos de texto sin unirlos."""
+    student_info = {}
+    academic_history = []
+    for tipo, dato in iterar_notas(fragmentos):
+        if tipo == "estudiante":
+            student_info = dato
+        elif tipo == "semestre":
+            academic_history.append(dato)
     return {"informacion_estudiante": student_info, "historial_academico": academic_history}
+
+def parse_notas_desde_texto(texto_ocr):
+    if not texto_ocr:
+        # print("No se pudo extraer texto del PDF o el texto está vacío.") # Se maneja en el endpoint
+        return {
+            "informacion_estudiante": {},
+            "historial_academico": []
+        }
+
+    # No es necesario imprimir advertencias aquí, se pueden manejar en la respuesta del endpoint si es necesario
+    return parse_notas_desde_lineas((texto_ocr,))
 # --- Fin de tus funciones ---
\ No newline at end of file
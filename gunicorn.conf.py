@@ -0,0 +1,45 @@
+# Configuración de gunicorn para producción:
+#     gunicorn -c gunicorn.conf.py
+# Las variables GUNICORN_* permiten ajustar la concurrencia sin reconstruir la imagen.
+import multiprocessing
+import os
+import tempfile
+
+wsgi_app = "app:create_app(iniciar=False)"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Un proceso por núcleo (las extracciones de PDF son CPU) y varios hilos por proceso
+# para las esperas de red con Neo4j; el pool de conexiones de cada worker debe
+# cubrir al menos `threads` sesiones simultáneas (NEO4J_MAX_POOL_SIZE).
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+
+# El pensum y la caché de recomendaciones viven en cada worker. Para que un
+# POST /curriculum/refresh o una ingesta atendidos por un worker invaliden también a
+# los demás, los workers comparten los contadores de generación en un archivo SQLite
+# (SHARED_STATE_PATH, ver app.py). Si no se configuró, se usa uno por maestro. Se
+# define aquí porque la app se importa (preload_app) después de leer esta configuración.
+if workers > 1 and not (os.getenv("SHARED_STATE_PATH") or os.getenv("RECOMMENDATION_CACHE_PATH")):
+    os.environ["SHARED_STATE_PATH"] = os.path.join(tempfile.gettempdir(), f"recomendador-estado-{os.getpid()}.sqlite")
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Reciclar workers periódicamente acota el crecimiento de memoria
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+# La app se importa una sola vez en el maestro (sin abrir conexiones) y cada
+# worker crea su propio driver, pensum en memoria, cachés y cola después del fork.
+preload_app = True
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+
+
+def post_fork(server, worker):
+    import app as aplicacion
+    aplicacion.iniciar_servicios()
+
+
+def worker_exit(server, worker):
+    import app as aplicacion
+    aplicacion.detener_servicios()
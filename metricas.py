@@ -0,0 +1,126 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Métricas en formato de texto de Prometheus ---
+# Histogramas con etiquetas, registrados en un registro global y expuestos en /metrics.
+# Los valores son del proceso actual: con varios workers de gunicorn cada uno
+# publica los suyos (Prometheus los distingue por la instancia que responde).
+
+# Límites por defecto en segundos (de 1 ms a 10 s)
+LIMITES_POR_DEFECTO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor))
+
+
+class Histograma:
+    """Histograma acumulativo por combinación de etiquetas (mismo modelo que el de Prometheus)."""
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_POR_DEFECTO):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(sorted(limites))
+        self._series = {}  # valores de etiquetas -> [conteos por límite..., +Inf], suma
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(str(etiquetas.get(e, "")) for e in self.etiquetas)
+        posicion = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa la duración en segundos del bloque `with` (también si lanza una excepción)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def exponer(self):
+        """Líneas del histograma en formato de texto de Prometheus."""
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items())
+        for clave, conteos, suma in series:
+            etiquetas = [f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave)]
+            acumulado = 0
+            for limite, conteo in zip(self.limites + (float("inf"),), conteos):
+                acumulado += conteo
+                le = ",".join(etiquetas + [f'le="{_formatear_numero(limite)}"'])
+                lineas.append(f"{self.nombre}_bucket{{{le}}} {acumulado}")
+            sufijo = "{" + ",".join(etiquetas) + "}" if etiquetas else ""
+            lineas.append(f"{self.nombre}_sum{sufijo} {_formatear_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{sufijo} {acumulado}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_POR_DEFECTO):
+        """Devuelve el histograma `nombre`, creándolo la primera vez."""
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = Histograma(nombre, ayuda, etiquetas, limites)
+            return metrica
+
+    def exponer(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return "\n".join(linea for metrica in metricas for linea in metrica.exponer()) + "\n"
+
+
+registro = RegistroMetricas()
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def leer_con_tiempos(driver_instance, consulta, procesar, observar=None, **parametros):
+    """
+    Ejecuta `consulta` en una transacción de lectura y devuelve procesar(result).
+    Si se indica, llama a observar(etapa, segundos) para cada etapa del lado del cliente:
+    - session_acquire: desde pedir la transacción hasta que empieza (conexión del pool y BEGIN)
+    - query: envío de la consulta hasta recibir la cabecera del resultado
+    - consume: lectura de los registros (incluye la transferencia por la red)
+    Si el driver reintenta la transacción, query y consume son del último intento y
+    session_acquire incluye los intentos anteriores.
+    """
+    marcas = {}
+
+    def unidad(tx):
+        t0 = time.perf_counter()
+        marcas["session_acquire"] = t0 - inicio
+        result = tx.run(consulta, **parametros)
+        t1 = time.perf_counter()
+        marcas["query"] = t1 - t0
+        valor = procesar(result)
+        marcas["consume"] = time.perf_counter() - t1
+        return valor
+
+    inicio = time.perf_counter()
+    with driver_instance.session() as session:
+        valor = session.execute_read(unidad)
+    if observar:
+        for etapa, segundos in marcas.items():
+            observar(etapa, segundos)
+    return valor
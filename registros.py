@@ -0,0 +1,295 @@
+"""
+Representación compacta de transcripciones parseadas y exportación columnar.
+
+Una Transcripcion guarda los cursos en columnas: códigos, materias y semestres como
+cadenas internadas (una sola copia por valor en todo el proceso), notas en
+array('d') con NaN para los valores ausentes y el tipo de nota en array('b').
+El semestre de cada curso se normaliza una sola vez ('AAAA-1', 'AAAA-2', 'AAAA-V').
+a_dict() reconstruye exactamente la salida de parse_notas_desde_texto.
+
+Exportación para análisis (un registro por curso):
+    python registros.py notas.npz --cache /ruta/pdf_cache.sqlite
+    python registros.py notas.parquet --spool spool/ transcripciones.jsonl
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+from array import array
+
+import numpy as np
+
+from bd_funtions import semestre_tomado
+from funtions import iterar_notas
+
+TIPOS_NOTA = ("Definitiva", "Vacacional")
+_CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_NOTA)}
+_NAN = float("nan")
+
+
+def _internar(valor):
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
+def _a_float(valor):
+    return _NAN if valor is None else float(valor)
+
+
+def _de_float(valor):
+    return None if math.isnan(valor) else valor
+
+
+class Transcripcion:
+    """Transcripción de un estudiante con los cursos en columnas."""
+
+    __slots__ = (
+        "con_cabecera",    # False si el parser no produjo información del estudiante (texto vacío)
+        "codigo_estudiante", "nombre", "promedio_general", "creditos_aprobados_pensum",
+        "periodos",        # periodo original de cada bloque de semestre
+        "extras",          # por bloque: dict con matricula_honor/beca, o None
+        "bloque",          # array('H'): bloque de semestre de cada curso
+        "codigos", "materias", "semestres",  # listas de cadenas internadas
+        "tipos",           # array('b'): índice en TIPOS_NOTA, -1 si es otro valor
+        "definitivas", "habilitaciones",     # array('d'), NaN = sin valor
+        "atipicos",        # {(campo, posición): valor} que no cabe en las columnas tipadas
+    )
+
+    def __init__(self, info=None):
+        self.con_cabecera = bool(info)
+        info = info or {}
+        self.codigo_estudiante = info.get("codigo_estudiante")
+        self.nombre = info.get("nombre")
+        self.promedio_general = info.get("promedio_general")
+        self.creditos_aprobados_pensum = info.get("creditos_aprobados_pensum")
+        self.periodos = []
+        self.extras = []
+        self.bloque = array("H")
+        self.codigos = []
+        self.materias = []
+        self.semestres = []
+        self.tipos = array("b")
+        self.definitivas = array("d")
+        self.habilitaciones = array("d")
+        self.atipicos = {}
+
+    def __len__(self):
+        return len(self.codigos)
+
+    # --- Construcción ---
+    def agregar_semestre(self, semestre):
+        """Agrega un bloque de semestre con el formato de parse_notas_desde_texto."""
+        bloque = len(self.periodos)
+        periodo = semestre.get("periodo")
+        self.periodos.append(_internar(periodo))
+        extras = {clave: valor for clave, valor in semestre.items() if clave not in ("periodo", "cursos")}
+        self.extras.append(extras or None)
+        for curso in semestre.get("cursos", []):
+            posicion = len(self.codigos)
+            tipo_nota = curso.get("tipo_nota")
+            self.bloque.append(bloque)
+            self.codigos.append(_internar(curso.get("codigo")))
+            self.materias.append(_internar(curso.get("materia")))
+            self.semestres.append(_internar(semestre_tomado(periodo, tipo_nota)))
+            self.tipos.append(_CODIGO_TIPO.get(tipo_nota, -1))
+            if tipo_nota not in _CODIGO_TIPO:
+                self.atipicos[("tipo_nota", posicion)] = tipo_nota
+            for campo, columna in (("definitiva", self.definitivas), ("habilitacion", self.habilitaciones)):
+                valor = curso.get(campo)
+                if valor is None or isinstance(valor, float):
+                    columna.append(_a_float(valor))
+                else:
+                    # p. ej. una habilitación que el parser no pudo convertir a número
+                    columna.append(_NAN)
+                    self.atipicos[(campo, posicion)] = valor
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Convierte la salida de parse_notas_desde_texto."""
+        transcripcion = cls(datos.get("informacion_estudiante"))
+        for semestre in datos.get("historial_academico", []):
+            transcripcion.agregar_semestre(semestre)
+        return transcripcion
+
+    @classmethod
+    def desde_texto(cls, fragmentos):
+        """Parsea el texto (o fragmentos/líneas) directamente a la forma compacta."""
+        transcripcion = None
+        for tipo, dato in iterar_notas(fragmentos):
+            if tipo == "estudiante":
+                transcripcion = cls(dato)
+            elif tipo == "semestre":
+                transcripcion.agregar_semestre(dato)
+        return transcripcion
+
+    # --- Conversión ---
+    def informacion_estudiante(self):
+        if not self.con_cabecera:
+            return {}
+        return {
+            "nombre": self.nombre,
+            "codigo_estudiante": self.codigo_estudiante,
+            "promedio_general": self.promedio_general,
+            "creditos_aprobados_pensum": self.creditos_aprobados_pensum,
+        }
+
+    def _curso(self, posicion):
+        tipo = self.tipos[posicion]
+        return {
+            "codigo": self.codigos[posicion],
+            "materia": self.materias[posicion],
+            "tipo_nota": TIPOS_NOTA[tipo] if tipo >= 0 else self.atipicos[("tipo_nota", posicion)],
+            "definitiva": self.atipicos.get(("definitiva", posicion), _de_float(self.definitivas[posicion])),
+            "habilitacion": self.atipicos.get(("habilitacion", posicion), _de_float(self.habilitaciones[posicion])),
+        }
+
+    def a_dict(self):
+        """Mismo formato (y mismos valores) que parse_notas_desde_texto."""
+        historial = [{"periodo": periodo, "cursos": []} for periodo in self.periodos]
+        for posicion, bloque in enumerate(self.bloque):
+            historial[bloque]["cursos"].append(self._curso(posicion))
+        for semestre, extras in zip(historial, self.extras):
+            if extras:
+                semestre.update(extras)
+        return {"informacion_estudiante": self.informacion_estudiante(), "historial_academico": historial}
+
+    def filas_took(self):
+        """
+        Filas para el UNWIND de la ingesta, como bd_funtions._preparar_filas_took,
+        sin recorrer diccionarios anidados. Devuelve (filas, omitidas).
+        """
+        filas = []
+        omitidas = []
+        for posicion, (course_id, semestre) in enumerate(zip(self.codigos, self.semestres)):
+            grade = self.atipicos.get(("definitiva", posicion), _de_float(self.definitivas[posicion]))
+            if not course_id or grade is None:
+                omitidas.append({"codigo": course_id, "semestre": semestre, "motivo": "datos_incompletos"})
+                continue
+            filas.append({"idx": len(filas), "courseId": course_id, "grade": grade, "semester_taken": semestre})
+        return filas, omitidas
+
+
+# --- Exportación columnar ---
+def columnas(transcripciones):
+    """
+    Tabla con un registro por curso como dict de arreglos NumPy:
+    student_id, course_id, course_name, semester, grade_type, grade, remedial_grade, term_index.
+    """
+    transcripciones = [t for t in transcripciones if t is not None]
+    total = sum(len(t) for t in transcripciones)
+    student_ids = []
+    codigos = []
+    materias = []
+    semestres = []
+    tipos = np.empty(total, dtype=np.int8)
+    definitivas = np.empty(total, dtype=np.float64)
+    habilitaciones = np.empty(total, dtype=np.float64)
+    bloques = np.empty(total, dtype=np.uint16)
+    inicio = 0
+    for t in transcripciones:
+        fin = inicio + len(t)
+        student_ids.extend([t.codigo_estudiante] * len(t))
+        codigos.extend(t.codigos)
+        materias.extend(t.materias)
+        semestres.extend(t.semestres)
+        # Los arreglos de la transcripción se copian sin pasar por objetos de Python
+        tipos[inicio:fin] = np.frombuffer(t.tipos, dtype=np.int8)
+        definitivas[inicio:fin] = np.frombuffer(t.definitivas, dtype=np.float64)
+        habilitaciones[inicio:fin] = np.frombuffer(t.habilitaciones, dtype=np.float64)
+        bloques[inicio:fin] = np.frombuffer(t.bloque, dtype=np.uint16)
+        inicio = fin
+
+    def texto(valores):
+        return np.array(["" if v is None else v for v in valores], dtype=str)
+
+    return {
+        "student_id": texto(student_ids),
+        "course_id": texto(codigos),
+        "course_name": texto(materias),
+        "semester": texto(semestres),
+        "grade_type": tipos,
+        "grade": definitivas,
+        "remedial_grade": habilitaciones,
+        "term_index": bloques,
+    }
+
+
+def exportar(transcripciones, ruta):
+    """
+    Escribe la tabla de columnas() en `ruta`: .npz (NumPy, comprimido) o .parquet
+    (requiere pyarrow). Devuelve la cantidad de registros escritos.
+    """
+    tabla = columnas(transcripciones)
+    if ruta.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Exportar a Parquet requiere pyarrow (pip install pyarrow); usa .npz en su lugar.")
+        arrow = pa.table({nombre: pa.array(valores) for nombre, valores in tabla.items()})
+        arrow = arrow.replace_schema_metadata({"grade_type": json.dumps(TIPOS_NOTA)})
+        pq.write_table(arrow, ruta)
+    else:
+        np.savez_compressed(ruta, grade_type_names=np.array(TIPOS_NOTA), **tabla)
+    return len(tabla["grade"])
+
+
+# --- Fuentes de transcripciones ya parseadas ---
+def desde_cache(ruta, tabla="transcripciones"):
+    """Transcripciones guardadas en la caché SQLite de /procesar-pdf (PDF_CACHE_PATH)."""
+    conexion = sqlite3.connect(ruta)
+    try:
+        for (valor,) in conexion.execute(f"SELECT valor FROM {tabla}"):
+            entrada = json.loads(valor)
+            if isinstance(entrada, list):
+                entrada = entrada[1]  # [versión, valor] (ver cache_lru.CacheLRU.guardar)
+            yield Transcripcion.desde_dict(entrada["datos_parseados"])
+    finally:
+        conexion.close()
+
+
+def desde_spool(directorio):
+    """Transcripciones de los trabajos completados de la cola de ingesta (PDF_SPOOL_DIR)."""
+    for nombre in sorted(os.listdir(directorio)):
+        if not nombre.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directorio, nombre), encoding="utf-8") as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if estado.get("status") == "done" and estado.get("result"):
+            yield Transcripcion.desde_dict(estado["result"]["datos_parseados"])
+
+
+def desde_jsonl(ruta):
+    """Una salida de parse_notas_desde_texto por línea."""
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                yield Transcripcion.desde_dict(json.loads(linea))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta transcripciones ya parseadas a un archivo columnar (.npz o .parquet).")
+    parser.add_argument("salida", help="Archivo de salida: .npz o .parquet")
+    parser.add_argument("jsonl", nargs="*", help="Archivos JSONL con una transcripción parseada por línea")
+    parser.add_argument("--cache", action="append", default=[], help="Caché SQLite de transcripciones (PDF_CACHE_PATH)")
+    parser.add_argument("--spool", action="append", default=[], help="Directorio de spool de la cola de ingesta")
+    args = parser.parse_args(argv)
+
+    transcripciones = []
+    for ruta in args.cache:
+        transcripciones.extend(desde_cache(ruta))
+    for directorio in args.spool:
+        transcripciones.extend(desde_spool(directorio))
+    for ruta in args.jsonl:
+        transcripciones.extend(desde_jsonl(ruta))
+    registros = exportar(transcripciones, args.salida)
+    print(json.dumps({"transcripciones": len(transcripciones), "registros": registros, "salida": args.salida}))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Reingesta masiva de reportes de notas archivados.
+
+Recorre un directorio (o un .tar/.tar.gz) de PDFs, extrae y parsea cada uno en un
+pool de procesos y escribe los resultados en Neo4j en transacciones grandes.
+Cada lote confirmado se anota en un archivo de checkpoint, de modo que si el
+proceso se interrumpe se puede relanzar con el mismo checkpoint y continúa donde quedó.
+
+Uso:
+    python reingesta.py /ruta/a/pdfs --checkpoint reingesta.jsonl
+    python reingesta.py archivo.tar.gz --workers 8 --lote 500
+    python reingesta.py /ruta/a/pdfs --sin-neo4j --exportar notas.npz
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase, basic_auth
+
+from bd_funtions import registrar_estudiantes_en_neo4j_lote
+from funtions import extraer_texto_de_pdf
+from registros import Transcripcion, exportar
+
+
+def _listar_pdfs(origen):
+    """Genera (clave, ruta o bytes) para cada PDF del directorio o del tarball, en orden estable."""
+    if os.path.isdir(origen):
+        rutas = []
+        for raiz, _, archivos in os.walk(origen):
+            rutas.extend(os.path.join(raiz, a) for a in archivos if a.lower().endswith('.pdf'))
+        for ruta in sorted(rutas):
+            yield os.path.relpath(ruta, origen), ruta
+    else:
+        with tarfile.open(origen) as tar:
+            for miembro in tar:
+                if miembro.isfile() and miembro.name.lower().endswith('.pdf'):
+                    yield miembro.name, tar.extractfile(miembro).read()
+
+
+def _procesar_pdf(clave, fuente, max_paginas, rapido=False):
+    """
+    Se ejecuta en un proceso del pool: devuelve (clave, Transcripcion o None, error).
+    La forma compacta reduce lo que viaja entre procesos y lo que se acumula por lote.
+    """
+    try:
+        texto = extraer_texto_de_pdf(io.BytesIO(fuente) if isinstance(fuente, bytes) else fuente,
+                                     max_paginas=max_paginas, rapido=rapido)
+        if texto is None:
+            return clave, None, "sin_texto"
+        return clave, Transcripcion.desde_texto(texto), None
+    except Exception as e:
+        return clave, None, str(e)
+
+
+def _leer_checkpoint(ruta):
+    if not ruta or not os.path.exists(ruta):
+        return set()
+    procesados = set()
+    with open(ruta, encoding='utf-8') as f:
+        for linea in f:
+            try:
+                procesados.add(json.loads(linea)["clave"])
+            except (ValueError, KeyError):
+                continue  # línea incompleta de una ejecución interrumpida
+    return procesados
+
+
+class Reingesta:
+    def __init__(self, driver_instance, checkpoint=None, lote=200, intervalo_progreso=5.0, conservar=False):
+        self.driver = driver_instance
+        # Con conservar=True se guardan todas las transcripciones (para exportarlas al final)
+        self.transcripciones = [] if conservar else None
+        self.lote = lote
+        self.intervalo_progreso = intervalo_progreso
+        self._checkpoint = open(checkpoint, 'a', encoding='utf-8') if checkpoint else None
+        self._pendientes = []  # (clave, Transcripcion) a la espera de escribirse
+        self.inicio = time.time()
+        self._ultimo_progreso = self.inicio
+        self.contadores = {"pdfs": 0, "estudiantes": 0, "filas_escritas": 0, "filas_omitidas": 0, "errores": 0}
+
+    def _anotar(self, entradas):
+        if not self._checkpoint or not self.driver:
+            return
+        for clave, estado in entradas:
+            self._checkpoint.write(json.dumps({"clave": clave, "estado": estado}, ensure_ascii=False) + "\n")
+        self._checkpoint.flush()
+        os.fsync(self._checkpoint.fileno())
+
+    def agregar(self, clave, datos, error):
+        self.contadores["pdfs"] += 1
+        if error:
+            self.contadores["errores"] += 1
+            print(f"Error en {clave}: {error}", file=sys.stderr)
+            self._anotar([(clave, "error")])
+        else:
+            if self.transcripciones is not None:
+                self.transcripciones.append(datos)
+            self._pendientes.append((clave, datos))
+            if len(self._pendientes) >= self.lote:
+                self.escribir_lote()
+        self.reportar_progreso()
+
+    def escribir_lote(self):
+        if not self._pendientes:
+            return
+        claves = [clave for clave, _ in self._pendientes]
+        datos = [datos for _, datos in self._pendientes]
+        self._pendientes = []
+        if not self.driver:
+            # Modo solo parseo: no se anota el checkpoint porque nada se escribió
+            self.contadores["estudiantes"] += len(datos)
+            return
+        resultados = registrar_estudiantes_en_neo4j_lote(self.driver, datos)
+        entradas = []
+        for clave, resultado in zip(claves, resultados):
+            if resultado["exito"]:
+                self.contadores["estudiantes"] += 1
+                self.contadores["filas_escritas"] += resultado["filas_escritas"]
+                self.contadores["filas_omitidas"] += resultado["filas_omitidas"]
+                entradas.append((clave, "ok"))
+            elif resultado.get("error") == "datos_estudiante_incompletos":
+                self.contadores["errores"] += 1
+                print(f"{clave}: no se encontró el código o el nombre del estudiante", file=sys.stderr)
+                entradas.append((clave, "datos_estudiante_incompletos"))
+            else:
+                # Errores de la base de datos no se anotan: se reintentan al reanudar
+                self.contadores["errores"] += 1
+                print(f"Error escribiendo {clave} en Neo4j: {resultado.get('error')}", file=sys.stderr)
+        self._anotar(entradas)
+
+    def resumen(self):
+        duracion = max(time.time() - self.inicio, 1e-9)
+        return dict(self.contadores,
+                    segundos=round(duracion, 2),
+                    pdfs_por_segundo=round(self.contadores["pdfs"] / duracion, 2),
+                    filas_por_segundo=round(self.contadores["filas_escritas"] / duracion, 2))
+
+    def reportar_progreso(self, forzar=False):
+        ahora = time.time()
+        if not forzar and ahora - self._ultimo_progreso < self.intervalo_progreso:
+            return
+        self._ultimo_progreso = ahora
+        r = self.resumen()
+        print(f"[{r['segundos']:.0f}s] {r['pdfs']} PDFs ({r['pdfs_por_segundo']} PDFs/s), "
+              f"{r['filas_escritas']} filas ({r['filas_por_segundo']} filas/s), {r['errores']} errores",
+              file=sys.stderr)
+
+    def cerrar(self):
+        self.escribir_lote()
+        if self._checkpoint:
+            self._checkpoint.close()
+
+
+def ejecutar(origen, driver_instance, workers=None, lote=200, checkpoint=None, max_paginas=None, exportar_a=None,
+             rapido=False):
+    """
+    Reingesta todos los PDFs de `origen` y devuelve el resumen de throughput.
+    Con `exportar_a` escribe además las notas de las transcripciones procesadas
+    en un archivo columnar (ver registros.exportar).
+    """
+    ya_procesados = _leer_checkpoint(checkpoint)
+    reingesta = Reingesta(driver_instance, checkpoint=checkpoint, lote=lote, conservar=bool(exportar_a))
+    workers = workers or os.cpu_count() or 1
+    en_vuelo_max = workers * 4  # acota la memoria cuando los PDFs vienen de un tarball
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            en_vuelo = set()
+            for clave, fuente in _listar_pdfs(origen):
+                if clave in ya_procesados:
+                    continue
+                en_vuelo.add(pool.submit(_procesar_pdf, clave, fuente, max_paginas, rapido))
+                if len(en_vuelo) >= en_vuelo_max:
+                    listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        reingesta.agregar(*futuro.result())
+            for futuro in en_vuelo:
+                reingesta.agregar(*futuro.result())
+    finally:
+        reingesta.cerrar()
+    reingesta.reportar_progreso(forzar=True)
+    resumen = reingesta.resumen()
+    if exportar_a:
+        resumen["registros_exportados"] = exportar(reingesta.transcripciones, exportar_a)
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reingesta masiva de reportes de notas en PDF.")
+    parser.add_argument("origen", help="Directorio con PDFs (se recorre recursivamente) o archivo .tar/.tar.gz")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para extraer y parsear (por defecto, uno por núcleo)")
+    parser.add_argument("--lote", type=int, default=200, help="Transcripciones por transacción de Neo4j")
+    parser.add_argument("--checkpoint", default=None, help="Archivo JSONL con los PDFs ya procesados; permite reanudar")
+    parser.add_argument("--max-paginas", type=int, default=None, help="Máximo de páginas a leer por PDF")
+    parser.add_argument("--rapido", action="store_true", help="Extracción rápida (ver benchmarks/validar_extraccion.py)")
+    parser.add_argument("--sin-neo4j", action="store_true", help="Solo extraer y parsear (no escribe en la base de datos)")
+    parser.add_argument("--exportar", default=None, help="Archivo .npz o .parquet con las notas de los PDFs procesados en esta ejecución")
+    args = parser.parse_args(argv)
+
+    driver_instance = None
+    if not args.sin_neo4j:
+        load_dotenv()
+        driver_instance = GraphDatabase.driver(os.getenv('NEO4J_URI'),
+                                               auth=basic_auth(os.getenv('NEO4J_USER'), os.getenv('NEO4J_PASSWORD')))
+        driver_instance.verify_connectivity()
+    try:
+        resumen = ejecutar(args.origen, driver_instance, workers=args.workers, lote=args.lote,
+                           checkpoint=args.checkpoint, max_paginas=args.max_paginas, exportar_a=args.exportar,
+                           rapido=args.rapido)
+    finally:
+        if driver_instance:
+            driver_instance.close()
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 0 if resumen["errores"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())